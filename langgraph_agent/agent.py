@@ -9,24 +9,45 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import ToolMessage, HumanMessage, AIMessage
-import json
+import functools
+import os
+import sys
+from pathlib import Path
+
+# JSON serialization and tracing setup are shared with the MCP servers in ../source
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 from ref import sample_response_for_get_transactions
+from source.serialization import dumps, loads
+from source.tracing import configure_tracing
+from tracing import TraceContextAuth, traced_tool, tracer
 from chainlit import AskActionMessage, Action
 
 load_dotenv()
+configure_tracing("vantage-chat-agent")
+
+# Set MCP_GATEWAY_URL (e.g. http://localhost:8010) to reach both servers through `python -m source.gateway`
+MCP_GATEWAY_URL = os.getenv("MCP_GATEWAY_URL")
 
 multi_mcp_config = {
     "mcp1": {
-        "url": "http://localhost:8001/mcp",
+        "url": f"{MCP_GATEWAY_URL}/dummy/mcp" if MCP_GATEWAY_URL else "http://localhost:8001/mcp",
         "transport": "streamable_http",
+        # Forwards the current trace to the server as a `traceparent` header
+        "auth": TraceContextAuth(),
     },
     "mcp2": {
-        "url": "http://localhost:8002/mcp",
+        "url": f"{MCP_GATEWAY_URL}/fx/mcp" if MCP_GATEWAY_URL else "http://localhost:8002/mcp",
         "transport": "streamable_http",
+        # Forwards the current trace to the server as a `traceparent` header
+        "auth": TraceContextAuth(),
     },
 }
 multi_mcp_client = MultiServerMCPClient(multi_mcp_config)
 
+# Tools whose results are rendered as a table of FX transactions or aggregates
+FX_TABLE_TOOLS = ("GetForeignExchangeTransactionData", "AggregateForeignExchangeTransactions")
+
 # System prompt for guiding tool usage
 SYSTEM_PROMPT = """You are a helpful AI assistant with access to specialized tools through MCP (Model Context Protocol).
 
@@ -55,6 +76,14 @@ Be efficient and thoughtful: use tools when they add value, but respond directly
 model_client = ChatGoogleGenerativeAI(model="gemini-2.0-flash", convert_system_message_to_human=True)
 
 
+@functools.lru_cache(maxsize=32)
+def parse_tool_content(content):
+    """Parse a ToolMessage's JSON content once, however many post-processors read it
+
+    Every caller gets the same cached object, so treat it as read-only (copy before changing it).
+    """
+    return loads(content)
+
 # Store active connections per session
 def extract_tool_context(messages):
     """Extract context from ToolMessage for enhanced AI response"""
@@ -72,7 +101,7 @@ def extract_tool_context(messages):
     
     try:
         # 3. Parse and extract what you need
-        tool_data = json.loads(tool_message.content)
+        tool_data = parse_tool_content(tool_message.content)
         
         # 4. Extract specific info (e.g., from RAG hits)
         extracted_chunks = []
@@ -94,7 +123,7 @@ def extract_tool_context(messages):
         
         return final_chunk_text, document_urls
         
-    except (json.JSONDecodeError, KeyError, AttributeError) as e:
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
         print(f"Error parsing tool message: {e}")
         return None, None
 
@@ -131,18 +160,20 @@ def enhance_tool_context_json(messages):
     if not tool_message:
         return None
     try:
-        tool_data = json.loads(tool_message.content)
+        tool_data = parse_tool_content(tool_message.content)
         # Heuristically check if this is from GetForeignExchangeTransactionData
         # (since tool name may not be present, check for known keys)
         result = tool_data.get("result")
         if not result:
             return None
         # If result is a list of dicts, or a dict with transactionId, treat as FX transaction data
+        # (rows from AggregateForeignExchangeTransactions carry a count instead)
         if (isinstance(result, dict) and "transactionId" in result) or (
-            isinstance(result, list) and result and isinstance(result[0], dict) and "transactionId" in result[0]
+            isinstance(result, list) and result and isinstance(result[0], dict)
+            and ("transactionId" in result[0] or "count" in result[0])
         ):
             # Prepare a system message
-            json_str = json.dumps(result, indent=2)
+            json_str = dumps(result)
             system_message = {
                 "role": "system",
                 "content": (
@@ -167,7 +198,7 @@ async def create_mcp_session():
     """Create and initialize Multi-MCP session with proper error handling"""
     try:
         # Load tools from all MCP servers
-        tools = await multi_mcp_client.get_tools()
+        tools = [traced_tool(tool) for tool in await multi_mcp_client.get_tools()]
         agent = create_react_agent(model_client, tools, prompt=SYSTEM_PROMPT)
         return {
             'agent': agent,
@@ -177,6 +208,12 @@ async def create_mcp_session():
         print(f"Error creating Multi-MCP session: {e}")
         raise
 
+async def invoke_agent(agent, messages):
+    """Run one agent invocation inside its own span"""
+    with tracer.start_as_current_span("agent.ainvoke") as span:
+        span.set_attribute("agent.messages", len(messages))
+        return await agent.ainvoke({"messages": messages})
+
 async def cleanup_connection(connection_info):
     """Safely cleanup MCP connection"""
     try:
@@ -221,7 +258,13 @@ async def start():
 
 @cl.on_message
 async def main(message: cl.Message):
-    """Handle incoming messages"""
+    """Handle incoming messages, tracing the whole turn as one trace"""
+    with tracer.start_as_current_span("chat.turn") as span:
+        span.set_attribute("chat.session_id", str(cl.user_session.get("id")))
+        await handle_message(message)
+
+async def handle_message(message: cl.Message):
+    """Answer one chat message with the agent"""
     connection_info = cl.user_session.get("connection_info")
     
     if not connection_info or 'agent' not in connection_info:
@@ -231,6 +274,8 @@ async def main(message: cl.Message):
     # Show typing indicator
     async with cl.Step(name="thinking", type="run") as step:
         step.output = "Processing your message..."
+        # Replaced with the tool reasoning when a tool is called
+        reasoning_str = step.output
         try:
             # Get conversation history
             message_history = cl.user_session.get("message_history", [])
@@ -238,7 +283,7 @@ async def main(message: cl.Message):
                 message_history.append({"role": "system", "content": SYSTEM_PROMPT})
             message_history.append({"role": "user", "content": message.content})
             agent = connection_info['agent']
-            response = await agent.ainvoke({"messages": message_history})
+            response = await invoke_agent(agent, message_history)
             full_messages = response.get("messages", []) if isinstance(response, dict) else []
 
             # --- MEMORY REFRESH & FOLLOW-UP LOGIC START ---
@@ -285,7 +330,7 @@ async def main(message: cl.Message):
                 message_history = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": message.content}]
                 cl.user_session.set("message_history", message_history)
                 await cl.Message(content="🔄 Context has been refreshed due to a new topic or data request.").send()
-                response = await agent.ainvoke({"messages": message_history})
+                response = await invoke_agent(agent, message_history)
                 full_messages = response.get("messages", []) if isinstance(response, dict) else []
             elif new_tool_call_signature:
                 # Tool call, but same as last one, retain memory
@@ -302,7 +347,7 @@ async def main(message: cl.Message):
                 # Add the last tool context as a system message
                 enhanced_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
                 # Add the last tool context as a system message (format as JSON for clarity)
-                json_str = json.dumps(last_tool_context, indent=2) if isinstance(last_tool_context, dict) else str(last_tool_context)
+                json_str = dumps(last_tool_context) if isinstance(last_tool_context, dict) else str(last_tool_context)
                 enhanced_messages.append({
                     "role": "system",
                     "content": (
@@ -311,7 +356,7 @@ async def main(message: cl.Message):
                     )
                 })
                 enhanced_messages.append({"role": "user", "content": message.content})
-                final_response = await agent.ainvoke({"messages": enhanced_messages})
+                final_response = await invoke_agent(agent, enhanced_messages)
                 response = final_response
                 # Add assistant response to history
                 message_history.append({"role": "assistant", "content": str(response)})
@@ -322,14 +367,14 @@ async def main(message: cl.Message):
                 cl.user_session.set("message_history", message_history)
                 # step.output = "Response generated!"
             else:
-                fx_tool_message = next((m for m in full_messages if isinstance(m, ToolMessage) and getattr(m, 'name', None) == 'GetForeignExchangeTransactionData'), None)
+                fx_tool_message = next((m for m in full_messages if isinstance(m, ToolMessage) and getattr(m, 'name', None) in FX_TABLE_TOOLS), None)
                 if fx_tool_message:
                     system_message = enhance_tool_context_json(full_messages)
                     print("got json data\n\n\n\n")
                     enhanced_messages = message_history.copy()
                     if system_message:
                         enhanced_messages.append(system_message)
-                    final_response = await agent.ainvoke({"messages": enhanced_messages})
+                    final_response = await invoke_agent(agent, enhanced_messages)
                     response = final_response
                     message_history.append({"role": "assistant", "content": str(response)})
                     cl.user_session.set("message_history", message_history)
@@ -346,7 +391,7 @@ async def main(message: cl.Message):
                         message_history, extracted_context, document_urls
                     )
                     if extracted_context:
-                        final_response = await agent.ainvoke({"messages": enhanced_messages})
+                        final_response = await invoke_agent(agent, enhanced_messages)
                         response = final_response
                     message_history.append({"role": "assistant", "content": str(response)})
                     cl.user_session.set("message_history", message_history)
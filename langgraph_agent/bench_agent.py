@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the overhead agent.py adds on top of the model and tools.
+
+The Gemini client is swapped for a scripted chat model with configurable
+latency, MCP tools are served in-process by the dummy servers in `source/`,
+and Chainlit is replaced by a recorder that serializes what would be sent to
+the browser. Each turn runs through the real `main` handler and is broken down
+into simulated model time, tool time and the time our own code adds.
+
+Run from the repository root:
+    python langgraph_agent/bench_agent.py --turns 20 --token-latency 0.005 --output agent_bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")  # model_client is replaced before any call
+
+import agent  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from langchain_mcp_adapters.tools import load_mcp_tools  # noqa: E402
+from mcp.shared.memory import create_connected_server_and_client_session  # noqa: E402
+
+from source import server_dummy, server_dummy2  # noqa: E402
+
+# Scenario name -> (user message, tool the model calls or None, tool arguments)
+SCENARIOS = {
+    "direct": ("What is a credit limit?", None, {}),
+    "search": ("What are the benefits of travel rewards cards?", "SemanticSearch", {"message": "travel rewards"}),
+    "fx_lookup": ("Show USD/CAD rates for 2023", "ForeignExchangeLookup",
+                  {"currencyCode": "USD/CAD", "date_range": "2023/01/01-2024/01/01"}),
+    "fx_transactions": ("Show my rejected FX transactions", "GetForeignExchangeTransactionData",
+                        {"settlement_status": "Rejected"}),
+}
+
+
+class Timers:
+    """Accumulated seconds and call counts per named section of one turn."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+
+timers = Timers()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that follows a tool-call plan instead of calling an LLM.
+
+    If a tool is planned and the conversation has no tool result yet, the model
+    asks for that tool; otherwise it answers with `answer_tokens` words. When
+    the last message is injected system context it answers directly, as the
+    real model does. Latency is `first_token_latency` + `token_latency` per
+    output token and is recorded as model time.
+    """
+
+    tool_name: Optional[str] = None
+    tool_args: dict = {}
+    answer_tokens: int = 50
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next_message(self, messages) -> AIMessage:
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        has_result = any(isinstance(m, ToolMessage) for m in messages[last_human + 1:])
+        if self.tool_name and not has_result and not isinstance(messages[-1], SystemMessage):
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": self.tool_name, "args": self.tool_args, "id": f"call_{len(messages)}"}],
+            )
+        return AIMessage(content=" ".join(["token"] * self.answer_tokens))
+
+    def _latency(self, message: AIMessage) -> float:
+        tokens = len(message.content.split()) or 1
+        return self.first_token_latency + self.token_latency * tokens
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._next_message(messages)
+        delay = self._latency(message)
+        time.sleep(delay)
+        timers.add("model", delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._next_message(messages)
+        delay = self._latency(message)
+        await asyncio.sleep(delay)
+        timers.add("model", delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class StubMCPClient:
+    """Stands in for MultiServerMCPClient, serving the dummy servers in memory."""
+
+    def __init__(self):
+        self._stack = contextlib.AsyncExitStack()
+        self.tools = []
+
+    async def __aenter__(self):
+        for server in (server_dummy.mcp, server_dummy2.mcp):
+            session = await self._stack.enter_async_context(
+                create_connected_server_and_client_session(server._mcp_server)
+            )
+            self.tools.extend(timed_tool(tool) for tool in await load_mcp_tools(session))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._stack.aclose()
+
+    async def get_tools(self):
+        return self.tools
+
+
+def timed_tool(tool):
+    call = tool.coroutine
+
+    async def coroutine(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await call(*args, **kwargs)
+        finally:
+            timers.add("tool", time.perf_counter() - started)
+
+    return tool.model_copy(update={"coroutine": coroutine})
+
+
+def timed(name: str, fn):
+    """Wrap a sync or async function of agent.py so its time is recorded as `name`."""
+    if asyncio.iscoroutinefunction(fn):
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                timers.add(name, time.perf_counter() - started)
+    else:
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timers.add(name, time.perf_counter() - started)
+    return wrapper
+
+
+class FakeChainlit:
+    """The parts of the `chainlit` module agent.py uses, without a browser.
+
+    Sending a message serializes it the way Chainlit does before emitting it
+    over the socket, and that time is recorded as rendering.
+    """
+
+    class UserSession(dict):
+        def set(self, key, value):
+            self[key] = value
+
+    class Action:
+        def __init__(self, name, label="", payload=None, **kwargs):
+            self.name, self.label, self.payload = name, label, payload or {}
+
+        def to_dict(self):
+            return {"name": self.name, "label": self.label, "payload": self.payload}
+
+    class Message:
+        def __init__(self, content="", author=None, actions=None, elements=None, **kwargs):
+            self.content, self.author, self.actions = content, author, actions or []
+
+        async def _emit(self):
+            started = time.perf_counter()
+            json.dumps({
+                "output": self.content,
+                "author": self.author,
+                "actions": [a.to_dict() for a in self.actions],
+            })
+            timers.add("render", time.perf_counter() - started)
+
+        async def send(self):
+            await self._emit()
+            return self
+
+        async def update(self):
+            await self._emit()
+
+    class Step:
+        def __init__(self, name="", type="run", **kwargs):
+            self.output = ""
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    def __init__(self):
+        self.user_session = self.UserSession()
+
+
+def install(model: ScriptedChatModel, client: StubMCPClient) -> FakeChainlit:
+    """Patch agent.py's model, MCP client, Chainlit and timed helpers in place."""
+    fake = FakeChainlit()
+    agent.cl = fake
+    agent.Action = FakeChainlit.Action
+    agent.model_client = model
+    agent.multi_mcp_client = client
+    agent.invoke_agent = timed("ainvoke", agent.invoke_agent)
+    for name in ("extract_tool_context", "enhance_message_with_context", "enhance_tool_context_json"):
+        setattr(agent, name, timed(name, getattr(agent, name)))
+    return fake
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "max": ordered[-1],
+    }
+
+
+async def run_scenario(name: str, turns: int, model: ScriptedChatModel, fake: FakeChainlit) -> dict[str, Any]:
+    """Run `turns` messages of one scenario in a fresh chat session and break down each turn."""
+    content, model.tool_name, model.tool_args = SCENARIOS[name]
+    fake.user_session.clear()
+    fake.user_session.set("id", f"bench-{name}")
+    connection_info = await agent.create_mcp_session()
+    fake.user_session.set("connection_info", connection_info)
+    fake.user_session.set("message_history", [])
+    fake.user_session.set("tools", [])
+
+    rows = defaultdict(list)
+    for _ in range(turns):
+        timers.reset()
+        started = time.perf_counter()
+        # The handler prints debug output; keep its cost but not the noise
+        with contextlib.redirect_stdout(io.StringIO()):
+            await agent.main(FakeChainlit.Message(content=content))
+        wall = time.perf_counter() - started
+        model_time, tool_time = timers.seconds["model"], timers.seconds["tool"]
+        parsing = sum(timers.seconds[k] for k in (
+            "extract_tool_context", "enhance_message_with_context", "enhance_tool_context_json"))
+        graph = timers.seconds["ainvoke"] - model_time - tool_time
+        overhead = wall - model_time - tool_time
+        rows["wall"].append(wall)
+        rows["model"].append(model_time)
+        rows["tool"].append(tool_time)
+        rows["overhead"].append(overhead)
+        rows["graph"].append(graph)
+        rows["parse_and_enhance"].append(parsing)
+        rows["render"].append(timers.seconds["render"])
+        rows["other"].append(overhead - graph - parsing - timers.seconds["render"])
+        rows["ainvoke_calls"].append(timers.calls["ainvoke"])
+    history = len(fake.user_session.get("message_history", []))
+    return {
+        "turns": turns,
+        "history_length": history,
+        "extra_ainvoke_calls_per_turn": statistics.fmean(rows.pop("ainvoke_calls")) - 1,
+        "seconds": {key: summarize(values) for key, values in rows.items()},
+    }
+
+
+def print_report(results: dict[str, Any]):
+    columns = ["wall", "model", "tool", "overhead", "graph", "parse_and_enhance", "render", "other"]
+    print(f"{'scenario':<18}{'extra':>6}" + "".join(f"{c[:10]:>11}" for c in columns) + "   (mean ms per turn)")
+    for name, result in results.items():
+        cells = "".join(f"{result['seconds'][c]['mean'] * 1000:>11.2f}" for c in columns)
+        print(f"{name:<18}{result['extra_ainvoke_calls_per_turn']:>6.1f}{cells}")
+
+
+async def run(args) -> dict[str, Any]:
+    model = ScriptedChatModel(
+        answer_tokens=args.answer_tokens,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+    )
+    async with StubMCPClient() as client:
+        fake = install(model, client)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await run_scenario(args.scenario[0], 1, model, fake)  # warm up imports and caches
+        return {name: await run_scenario(name, args.turns, model, fake) for name in args.scenario}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure agent.py overhead per turn with a scripted model")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run; repeat for several (default: all)")
+    parser.add_argument("--turns", type=int, default=10, help="Messages per scenario, in one chat session")
+    parser.add_argument("--answer-tokens", type=int, default=50)
+    parser.add_argument("--first-token-latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per output token")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import functools
+
+import httpx
+from opentelemetry import propagate, trace
+
+# The tracer provider itself is set up by source.tracing.configure_tracing, shared with the servers
+tracer = trace.get_tracer("vantage-chat-agent")
+
+
+class TraceContextAuth(httpx.Auth):
+    """Adds W3C trace headers for the active span to every MCP HTTP request.
+
+    Passed as the `auth` of a streamable-HTTP MCP connection so the servers can
+    continue the agent's trace.
+    """
+
+    def auth_flow(self, request: httpx.Request):
+        propagate.inject(request.headers)
+        yield request
+
+
+def traced_tool(tool):
+    """Return a copy of a LangChain MCP tool whose calls run in a client span."""
+    call = tool.coroutine
+
+    @functools.wraps(call)
+    async def coroutine(*args, **kwargs):
+        with tracer.start_as_current_span(f"mcp.tool {tool.name}", kind=trace.SpanKind.CLIENT) as span:
+            span.set_attribute("mcp.tool", tool.name)
+            return await call(*args, **kwargs)
+
+    return tool.model_copy(update={"coroutine": coroutine})
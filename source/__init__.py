@@ -1,7 +1,9 @@
 import argparse
-from .server_dummy import mcp
 
 def main():
+    # Imported here so that importing a submodule (e.g. from the agent) does not build a server
+    from .server_dummy import mcp
+
     parser = argparse.ArgumentParser(
         description="Exposes Tachyon Search as MCP"
     )
@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+# Arguments sent with each tool unless overridden with --args TOOL=JSON
+DEFAULT_ARGUMENTS: dict[str, dict[str, Any]] = {
+    "SemanticSearch": {"message": "What are the benefits of a travel rewards credit card?"},
+    "semantic_search": {"query": "What are the benefits of a travel rewards credit card?"},
+    "ForeignExchangeLookup": {"currencyCode": "USD/CAD", "date_range": "2023/01/01-2024/01/01"},
+    "GetForeignExchangeTransactionData": {"settlement_status": "All"},
+}
+DEFAULT_MIX = "SemanticSearch=2,ForeignExchangeLookup=1,GetForeignExchangeTransactionData=1"
+DEFAULT_URLS = ["http://localhost:8001/mcp", "http://localhost:8002/mcp"]
+
+
+def percentile(ordered: list[float], p: float) -> float | None:
+    """Nearest-rank percentile of already sorted samples, or None if there are none."""
+    if not ordered:
+        return None
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Parse "ToolA=2,ToolB=1" into relative weights (a bare name has weight 1)."""
+    mix: dict[str, float] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = entry.partition("=")
+        mix[name.strip()] = float(weight) if weight else 1.0
+    if not mix or any(weight < 0 for weight in mix.values()) or not sum(mix.values()):
+        raise ValueError(f"Invalid tool mix: {spec!r}")
+    return mix
+
+
+@dataclass
+class Recorder:
+    """Latencies (seconds) and error counts per tool."""
+
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def record(self, tool: str, seconds: float, failed: bool) -> None:
+        self.latencies.setdefault(tool, []).append(seconds)
+        if failed:
+            self.errors[tool] = self.errors.get(tool, 0) + 1
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        def describe(samples: list[float], errors: int) -> dict[str, Any]:
+            ordered = sorted(samples)
+            return {
+                "calls": len(ordered),
+                "errors": errors,
+                "throughput": len(ordered) / elapsed if elapsed else 0.0,
+                "mean": sum(ordered) / len(ordered) if ordered else None,
+                "p50": percentile(ordered, 50),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None,
+            }
+
+        every = [s for samples in self.latencies.values() for s in samples]
+        return {
+            "elapsed": elapsed,
+            "overall": describe(every, sum(self.errors.values())),
+            "tools": {tool: describe(s, self.errors.get(tool, 0)) for tool, s in sorted(self.latencies.items())},
+        }
+
+
+class BenchClient:
+    """One benchmark user: an MCP session to each server, with calls routed by tool name."""
+
+    def __init__(self, urls: list[str], transport: str):
+        self.urls = urls
+        self.transport = transport
+        self.routes: dict[str, ClientSession] = {}
+        self._stack = AsyncExitStack()
+
+    async def __aenter__(self) -> "BenchClient":
+        for url in self.urls:
+            if self.transport == "sse":
+                read, write = await self._stack.enter_async_context(sse_client(url))
+            else:
+                read, write, _ = await self._stack.enter_async_context(streamablehttp_client(url))
+            session = await self._stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            for tool in (await session.list_tools()).tools:
+                self.routes.setdefault(tool.name, session)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._stack.aclose()
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> bool:
+        """Call `tool` and return whether it failed (protocol error or `{"error": ...}` result)."""
+        try:
+            result = await self.routes[tool].call_tool(tool, arguments)
+        except Exception:
+            return True
+        if result.isError:
+            return True
+        text = "".join(getattr(c, "text", "") or "" for c in result.content)
+        return text.startswith("{") and ('"error"' in text[:64] or '"Error"' in text[:64])
+
+
+class Benchmark:
+    """Drive a weighted mix of tool calls through a pool of MCP sessions.
+
+    In closed-loop mode every session issues its next call as soon as the
+    previous one returns. In open-loop mode calls arrive at a fixed rate across
+    the pool regardless of how fast they complete, and latency is measured from
+    each call's scheduled start so that a backlog shows up in the percentiles.
+    """
+
+    def __init__(
+        self,
+        clients: list[BenchClient],
+        mix: dict[str, float],
+        arguments: dict[str, dict[str, Any]],
+        duration: float,
+        requests: int | None = None,
+        seed: int | None = None,
+    ):
+        self.clients = clients
+        self.tools = list(mix)
+        self.weights = list(mix.values())
+        self.arguments = arguments
+        self.duration = duration
+        self.requests = requests
+        self.random = random.Random(seed)
+        self.recorder = Recorder()
+        self._issued = 0
+
+    def _next_tool(self) -> str | None:
+        if self.requests is not None and self._issued >= self.requests:
+            return None
+        self._issued += 1
+        return self.random.choices(self.tools, self.weights)[0]
+
+    async def _timed_call(self, client: BenchClient, tool: str, started: float) -> None:
+        failed = await client.call(tool, self.arguments.get(tool, {}))
+        self.recorder.record(tool, time.perf_counter() - started, failed)
+
+    async def run_closed(self) -> dict[str, Any]:
+        deadline = time.perf_counter() + self.duration
+
+        async def user(client: BenchClient) -> None:
+            while time.perf_counter() < deadline and (tool := self._next_tool()) is not None:
+                await self._timed_call(client, tool, time.perf_counter())
+
+        began = time.perf_counter()
+        await asyncio.gather(*(user(client) for client in self.clients))
+        return self.recorder.summary(time.perf_counter() - began)
+
+    async def run_open(self, rate: float) -> dict[str, Any]:
+        interval = 1.0 / rate
+        began = time.perf_counter()
+        deadline = began + self.duration
+        pending: set[asyncio.Task] = set()
+        n = 0
+        while (scheduled := began + n * interval) < deadline and (tool := self._next_tool()) is not None:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self._timed_call(self.clients[n % len(self.clients)], tool, scheduled))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            n += 1
+        if pending:
+            await asyncio.gather(*pending)
+        return self.recorder.summary(time.perf_counter() - began)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(seconds: float | None) -> str:
+    return f"{seconds * 1000:9.1f}" if seconds is not None else f"{'-':>9}"
+
+
+def print_report(summary: dict[str, Any], baseline: dict[str, Any] | None = None) -> None:
+    print(f"{'tool':<36}{'calls':>7}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    rows = [*summary["tools"].items(), ("overall", summary["overall"])]
+    for name, row in rows:
+        print(
+            f"{name:<36}{row['calls']:>7}{row['errors']:>7}{row['throughput']:>9.1f}"
+            f"{format_ms(row['p50'])}{format_ms(row['p95'])}{format_ms(row['p99'])}{format_ms(row['max'])}"
+        )
+        old = (baseline or {}).get("results", {})
+        old = old.get("overall") if name == "overall" else old.get("tools", {}).get(name)
+        if old:
+            deltas = [
+                f"{key} {(row[key] - old[key]) / old[key]:+.0%}"
+                for key in ("throughput", "p50", "p95", "p99")
+                if row[key] is not None and old.get(key)
+            ]
+            print(f"{'  vs baseline':<36}{', '.join(deltas)}")
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    mix = parse_mix(args.mix)
+    arguments = {**DEFAULT_ARGUMENTS, **{tool: json.loads(spec) for tool, spec in args.args}}
+    async with AsyncExitStack() as stack:
+        # Sessions are opened one by one: their transports must be closed by the task that opened them
+        clients = [await stack.enter_async_context(BenchClient(args.url, args.transport)) for _ in range(args.sessions)]
+        missing = [tool for tool in mix if tool not in clients[0].routes]
+        if missing:
+            raise SystemExit(f"Tools not served by {', '.join(args.url)}: {', '.join(missing)}")
+        bench = Benchmark(clients, mix, arguments, args.duration, args.requests, args.seed)
+        results = await (bench.run_open(args.rate) if args.mode == "open" else bench.run_closed())
+    return {
+        "commit": git_commit(),
+        "label": args.label,
+        "config": {
+            "urls": args.url,
+            "transport": args.transport,
+            "mode": args.mode,
+            "sessions": args.sessions,
+            "rate": args.rate if args.mode == "open" else None,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": mix,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test MCP servers with a mix of concurrent tool calls")
+    parser.add_argument(
+        "--url", action="append", help="MCP endpoint to connect to; repeat for several servers (default: 8001 and 8002)"
+    )
+    parser.add_argument("--transport", choices=["streamable-http", "sse"], default="streamable-http")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent client sessions per server")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--rate", type=float, default=50.0, help="Calls per second in open-loop mode")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many calls")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted tools, e.g. 'SemanticSearch=2,ForeignExchangeLookup=1'")
+    parser.add_argument(
+        "--args",
+        action="append",
+        default=[],
+        type=lambda spec: tuple(spec.split("=", 1)),
+        metavar="TOOL=JSON",
+        help="Arguments for a tool, e.g. 'SemanticSearch={\"message\": \"cashback\"}'",
+    )
+    parser.add_argument("--seed", type=int, help="Seed the tool mix for repeatable runs")
+    parser.add_argument("--label", help="Free-form label stored with the results")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+    args.url = args.url or DEFAULT_URLS
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report["results"], baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from .serialization import dumps, loads
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Entries are kept in an OrderedDict in recency order; a hit moves the entry
+    to the end and inserting past `max_entries` evicts from the front.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store `value` under `key` for `ttl` seconds (defaults to the cache TTL)."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for observability."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SQLiteTTLCache:
+    """Cross-process variant of `TTLCache` backed by a SQLite file in WAL mode.
+
+    Worker processes on one node share entries through the file. Values must be
+    JSON-serializable, or bytes, which are stored as BLOBs that `read` can
+    slice without loading the rest. Eviction removes the least recently read entries once
+    the table exceeds `max_entries`. Hit/miss counters are per process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: float = 300.0):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"), default=str)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        k = self._key(key)
+        row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (k,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.misses += 1
+            return default
+        if row[1] <= now:
+            self._db.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (k, now))
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, k))
+        self.hits += 1
+        return row[0] if isinstance(row[0], bytes) else loads(row[0])
+
+    def read(self, key: Hashable, offset: int, size: int) -> tuple[bytes, int] | None:
+        """Read `size` bytes at `offset` of a bytes value, and the value's total length.
+
+        Only the requested range is read from the file. Returns None if the
+        key is missing or expired.
+        """
+        k = self._key(key)
+        row = self._db.execute("SELECT rowid, expires_at FROM cache WHERE key = ?", (k,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.misses += 1
+            return None
+        if row[1] <= now:
+            self._db.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (k, now))
+            self.expirations += 1
+            self.misses += 1
+            return None
+        with self._db.blobopen("cache", "value", row[0], readonly=True) as blob:
+            total = len(blob)
+            blob.seek(min(max(offset, 0), total))
+            chunk = blob.read(max(size, 0))
+        self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, k))
+        self.hits += 1
+        return chunk, total
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store `value` under `key` for `ttl` seconds (defaults to the cache TTL)."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (self._key(key), value if isinstance(value, bytes) else dumps(value), expires_at, now),
+        )
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            cursor = self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            self.expirations += cursor.rowcount
+            overflow -= cursor.rowcount
+        if overflow > 0:
+            cursor = self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += cursor.rowcount
+
+    def invalidate(self, key: Hashable) -> None:
+        self._db.execute("DELETE FROM cache WHERE key = ?", (self._key(key),))
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM cache")
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for observability."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,83 @@
+import argparse
+import importlib
+import os
+import tempfile
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator
+
+import uvicorn
+from starlette.applications import Starlette
+
+from .tracing import configure_tracing
+
+# MCP servers that can be deployed, with their default ports
+SERVERS = {
+    "search": ("source.server", 8000),
+    "dummy": ("source.server_dummy", 8001),
+    "fx": ("source.server_dummy2", 8002),
+}
+
+
+def create_app() -> Starlette:
+    """Build a stateless streamable-HTTP app for the server named by MCP_SERVER_MODULE.
+
+    Called by uvicorn once in every worker process. Every request gets a fresh
+    transport (`stateless_http`) and a plain JSON response (`json_response`), so
+    any worker can serve any request. The server module's `server_lifespan`, if
+    any, is held open for the life of the worker so pooled resources are not
+    rebuilt per request.
+    """
+    module = importlib.import_module(os.environ["MCP_SERVER_MODULE"])
+    mcp = module.mcp
+    configure_tracing(mcp.name)
+    mcp.settings.stateless_http = True
+    mcp.settings.json_response = True
+    app = mcp.streamable_http_app()
+    server_lifespan = getattr(module, "server_lifespan", None)
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        # Exits in reverse: in-flight requests drain before server resources close
+        async with AsyncExitStack() as stack:
+            if server_lifespan is not None:
+                await stack.enter_async_context(server_lifespan(mcp))
+            await stack.enter_async_context(mcp.session_manager.run())
+            yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an MCP server in stateless multi-worker mode")
+    parser.add_argument("server", choices=sorted(SERVERS), help="Which MCP server to run")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, help="Port shared by all workers (defaults to the server's port)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds to let in-flight requests finish on shutdown",
+    )
+    args = parser.parse_args()
+
+    module, default_port = SERVERS[args.server]
+    os.environ["MCP_SERVER_MODULE"] = module
+    # Workers share cached search results through a SQLite file unless configured otherwise
+    if args.workers > 1:
+        os.environ.setdefault("SEARCH_CACHE_BACKEND", "sqlite")
+        # ...and publish their metrics so any worker's /metrics reports all of them
+        os.environ.setdefault("METRICS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="mcp-metrics-"))
+    uvicorn.run(
+        "source.deploy:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port or default_port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
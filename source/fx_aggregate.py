@@ -0,0 +1,114 @@
+from typing import Any
+
+import numpy as np
+
+from .fx_rates import period_keys, period_start
+from .fx_store import CATEGORY_FIELDS, MISSING_DAY, FxTransactionStore, format_day
+
+GROUP_FIELDS = (*CATEGORY_FIELDS, "currencyPair")
+BUCKETS = ("daily", "weekly", "monthly", "quarterly")
+# Output name prefix of each amount column
+AMOUNT_PREFIXES = {"buyCurrencyAmount": "buyAmount", "sellCurrencyAmount": "sellAmount"}
+
+
+def parse_group_by(group_by: str | list[str] | None) -> list[str]:
+    """Group fields from a comma-separated string or a list; raises ValueError for unknown fields."""
+    fields = [f.strip() for f in group_by.split(",")] if isinstance(group_by, str) else list(group_by or [])
+    fields = [f for f in fields if f]
+    unknown = [f for f in fields if f not in GROUP_FIELDS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}; use any of {', '.join(GROUP_FIELDS)}")
+    return fields
+
+
+def sorted_codes(codes: np.ndarray, categories: list[str]) -> np.ndarray:
+    """Remap codes so their order follows the sorted category values."""
+    rank = np.empty(len(categories), dtype=np.int64)
+    rank[np.argsort(np.array(categories, dtype=object), kind="stable")] = np.arange(len(categories))
+    return rank[codes]
+
+
+def group_columns(store: FxTransactionStore, rows: np.ndarray, field: str) -> tuple[np.ndarray, list[str]]:
+    """Per-row group codes (in sorted value order) for `field`, and the value of each code."""
+    if field == "currencyPair":
+        buy, buy_values = group_columns(store, rows, "buyCurrency")
+        sell, sell_values = group_columns(store, rows, "sellCurrency")
+        return buy * len(sell_values) + sell, [f"{b}/{s}" for b in buy_values for s in sell_values]
+    categories = store.categories[field]
+    return sorted_codes(store.codes[field][rows], categories), sorted(categories)
+
+
+def aggregate(
+    store: FxTransactionStore,
+    rows: np.ndarray,
+    group_by: list[str],
+    bucket: str | None = None,
+) -> list[dict[str, Any]]:
+    """Count the `rows` and summarize their buy/sell amounts per group.
+
+    Groups are the distinct combinations of `group_by` fields and, with a
+    `bucket`, of the period of `valueDate`. The group codes are combined into
+    one int64 key per row, so grouping is a single `np.unique` and each
+    statistic one `bincount` or `reduceat` over the rows sorted by group.
+    Amounts of "No Contract" are left out of the amount statistics but the
+    transaction is still counted. Amounts are summed as-is, so group by
+    buyCurrency/sellCurrency (or currencyPair) for sums in one currency.
+    """
+    columns: list[tuple[str, np.ndarray, list[str]]] = []
+    for field in group_by:
+        codes, values = group_columns(store, rows, field)
+        columns.append((field, codes, values))
+    if bucket:
+        if bucket not in BUCKETS:
+            raise ValueError(f"Invalid bucket {bucket!r}; use one of {', '.join(BUCKETS)}")
+        days = store.days["valueDate"][rows]
+        dated = days != MISSING_DAY
+        rows, days = rows[dated], days[dated]
+        columns = [(field, codes[dated], values) for field, codes, values in columns]
+        periods = period_keys(days, bucket)
+        first, last = (int(periods.min()), int(periods.max())) if len(periods) else (0, -1)
+        # Periods are labelled by their first day, in the wire format of valueDate
+        labels = [format_day(period_start(k, bucket)) for k in range(first, last + 1)]
+        columns.append(("valueDate", periods - first, labels))
+    if not len(rows):
+        return []
+
+    key = np.zeros(len(rows), dtype=np.int64)
+    for _, codes, values in columns:
+        key = key * len(values) + codes
+    keys, groups = np.unique(key, return_inverse=True)
+    counts = np.bincount(groups, minlength=len(keys))
+
+    # Decode each group's key back into its field codes (last field first), then
+    # build the rows with the fields in `group_by` order
+    field_codes = []
+    remainder = keys
+    for _, _, values in reversed(columns):
+        codes, remainder = remainder % len(values), remainder // len(values)
+        field_codes.append(codes)
+    field_codes.reverse()
+    result: list[dict[str, Any]] = [
+        {field: values[code] for (field, _, values), code in zip(columns, group)}
+        for group in zip(*field_codes)
+    ] if columns else [{} for _ in keys]
+    for entry, count in zip(result, counts):
+        entry["count"] = int(count)
+
+    order = np.argsort(groups, kind="stable")
+    starts = np.searchsorted(groups[order], np.arange(len(keys)))
+    for field, prefix in AMOUNT_PREFIXES.items():
+        amounts = store.amounts[field][rows]
+        known = ~np.isnan(amounts)
+        known_counts = np.bincount(groups, weights=known, minlength=len(keys))
+        sums = np.bincount(groups, weights=np.where(known, amounts, 0.0), minlength=len(keys))
+        sorted_amounts = amounts[order]
+        # fmin/fmax skip NaN; a group with no known amount stays NaN
+        minimums = np.fmin.reduceat(sorted_amounts, starts)
+        maximums = np.fmax.reduceat(sorted_amounts, starts)
+        for entry, n, total, low, high in zip(result, known_counts, sums, minimums, maximums):
+            entry[f"{prefix}Count"] = int(n)
+            entry[f"{prefix}Sum"] = round(float(total), 2)
+            entry[f"{prefix}Min"] = None if np.isnan(low) else round(float(low), 2)
+            entry[f"{prefix}Max"] = None if np.isnan(high) else round(float(high), 2)
+            entry[f"{prefix}Avg"] = round(float(total / n), 2) if n else None
+    return result
@@ -0,0 +1,495 @@
+import argparse
+import csv
+import functools
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .fx_store import CURRENCIES, parse_day
+
+# One <BUY><SELL>.npy file per currency pair, e.g. fx_rates/USDCAD.npy, plus one
+# <BUY><SELL>.<level>.npy rollup per level
+FX_RATES_DIR = os.getenv("FX_RATES_DIR", "fx_rates")
+# Most points ForeignExchangeLookup returns when it picks the granularity itself
+FX_MAX_POINTS = int(os.getenv("FX_MAX_POINTS", "120"))
+# Base currencies tried, in order, to derive pairs with no series of their own
+FX_CROSS_BASES = [c.strip().upper() for c in os.getenv("FX_CROSS_BASES", "USD").split(",") if c.strip()]
+GRANULARITIES = ("daily", "weekly", "monthly", "quarterly")
+ROLLUP_LEVELS = GRANULARITIES[1:]
+# Rows of a rollup array, one column per period. Volatility is kept as sums of
+# the daily log returns so a period can be extended without revisiting it.
+ROLLUP_ROWS = ("key", "open", "high", "low", "close", "count", "sum", "ret_count", "ret_sum", "ret_sq_sum")
+KEY, OPEN, HIGH, LOW, CLOSE, COUNT, SUM, RET_COUNT, RET_SUM, RET_SQ_SUM = range(len(ROLLUP_ROWS))
+
+DATE_RANGE_PATTERN = re.compile(r"^\s*(\d{4}/\d{1,2}/\d{1,2})\s*(?:-\s*(\d{4}/\d{1,2}/\d{1,2}))?\s*$")
+
+
+@functools.lru_cache(maxsize=256)
+def parse_date_range(date_range: str) -> tuple[int, int]:
+    """Parse "YYYY/MM/DD-YYYY/MM/DD" (or a single "YYYY/MM/DD") to inclusive epoch days.
+
+    Raises ValueError if the range is malformed or ends before it starts.
+    """
+    match = DATE_RANGE_PATTERN.match(date_range)
+    if not match:
+        raise ValueError(f"Invalid date range {date_range!r}; use YYYY/MM/DD-YYYY/MM/DD")
+    first = parse_day(match.group(1))
+    last = parse_day(match.group(2)) if match.group(2) else first
+    if last < first:
+        raise ValueError(f"Date range {date_range!r} ends before it starts")
+    return first, last
+
+
+def pair_key(currency_pair: str) -> str:
+    """"USD/CAD", "usd-cad" and "USDCAD" all become "USDCAD"."""
+    key = re.sub(r"[^A-Za-z]", "", currency_pair).upper()
+    if len(key) != 6:
+        raise ValueError(f"Invalid currency pair {currency_pair!r}; use two currency codes like USD/CAD")
+    return key
+
+
+def format_date(day: int) -> str:
+    return str(np.datetime64(int(day), "D")).replace("-", "/")
+
+
+def period_keys(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Period number of each epoch day: the day itself, or its Monday-based week, month or quarter."""
+    days = np.asarray(days, dtype=np.int64)
+    if granularity == "daily":
+        return days
+    if granularity == "weekly":
+        # 1970-01-01 was a Thursday; shifting by 3 starts weeks on Monday
+        return (days + 3) // 7
+    if granularity in ("monthly", "quarterly"):
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        return months if granularity == "monthly" else months // 3
+    raise ValueError(f"Invalid granularity {granularity!r}; use one of {', '.join(GRANULARITIES)}")
+
+
+def period_start(key: int, granularity: str) -> int:
+    """First epoch day of period `key` (inverse of `period_keys`)."""
+    if granularity == "daily":
+        return int(key)
+    if granularity == "weekly":
+        return int(key) * 7 - 3
+    months = int(key) * (3 if granularity == "quarterly" else 1)
+    return int(np.datetime64(months, "M").astype("datetime64[D]").astype(np.int64))
+
+
+def rollup(days: np.ndarray, rates: np.ndarray, level: str, prev_rate: float = np.nan) -> np.ndarray:
+    """Aggregate ascending observations into one ROLLUP_ROWS column per period.
+
+    `prev_rate` is the observation before `days[0]`, so the first daily return
+    can be counted; without it the first observation has no return.
+    """
+    if not len(days):
+        return np.empty((len(ROLLUP_ROWS), 0))
+    keys = period_keys(days, level)
+    starts = np.append(0, np.flatnonzero(keys[1:] != keys[:-1]) + 1)
+    ends = np.append(starts[1:], len(keys))
+    returns = np.diff(np.log(rates), prepend=np.log(prev_rate))
+    valid = np.isfinite(returns)
+    returns = np.where(valid, returns, 0.0)
+    return np.vstack([
+        keys[starts],
+        rates[starts],
+        np.maximum.reduceat(rates, starts),
+        np.minimum.reduceat(rates, starts),
+        rates[ends - 1],
+        ends - starts,
+        np.add.reduceat(rates, starts),
+        np.add.reduceat(valid, starts),
+        np.add.reduceat(returns, starts),
+        np.add.reduceat(returns * returns, starts),
+    ]).astype(np.float64)
+
+
+def rollup_points(rows: np.ndarray, level: str) -> list[dict[str, Any]]:
+    """Rollup columns as OHLC points, with the mean rate and the volatility (sample standard
+    deviation) of daily log returns in each period."""
+    count, ret_count = rows[COUNT], rows[RET_COUNT]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_ret = rows[RET_SUM] / ret_count
+        variance = (rows[RET_SQ_SUM] - ret_count * mean_ret * mean_ret) / (ret_count - 1)
+    volatility = np.where(ret_count > 1, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+    mean = rows[SUM] / count
+    return [
+        {
+            "date": format_date(period_start(key, level)),
+            "open": round(float(o), 6),
+            "high": round(float(h), 6),
+            "low": round(float(lo), 6),
+            "close": round(float(c), 6),
+            "mean": round(float(m), 6),
+            "volatility": round(float(v), 6),
+            "count": int(n),
+        }
+        for key, o, h, lo, c, m, v, n in zip(
+            rows[KEY], rows[OPEN], rows[HIGH], rows[LOW], rows[CLOSE], mean, volatility, count
+        )
+    ]
+
+
+def save_array(path: Path, array: np.ndarray) -> None:
+    """Write `array` to a new file and move it over `path`, so memory maps of the old file stay valid."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def file_stamp(path: Path) -> tuple[int, int] | None:
+    """Inode and modification time of `path` (None if it does not exist); changes when the file is replaced."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class RateSeries:
+    """Rates of one currency pair as a memory-mapped (2, n) float64 array.
+
+    Row 0 holds ascending epoch days and row 1 the rate on each day. Both rows
+    are contiguous, so a range is found by binary search over row 0 and read
+    as one slice of row 1; only the pages touched are loaded.
+    """
+
+    def __init__(self, data: np.ndarray):
+        if data.ndim != 2 or data.shape[0] != 2:
+            raise ValueError("rate series must be a (2, n) array of days and rates")
+        self.data = data
+
+    def __len__(self) -> int:
+        return self.data.shape[1]
+
+    @classmethod
+    def open(cls, path: str | Path) -> "RateSeries":
+        return cls(np.load(path, mmap_mode="r"))
+
+    @classmethod
+    def write(cls, path: str | Path, days: Any, rates: Any) -> "RateSeries":
+        """Persist observations sorted by day (the last rate wins for repeated days) and open them."""
+        days = np.asarray(days, dtype=np.float64)
+        rates = np.asarray(rates, dtype=np.float64)
+        order = np.argsort(days, kind="stable")
+        days, rates = days[order], rates[order]
+        keep = np.append(days[1:] != days[:-1], True)
+        save_array(Path(path), np.vstack([days[keep], rates[keep]]))
+        return cls.open(path)
+
+    def range(self, first: int, last: int) -> tuple[np.ndarray, np.ndarray]:
+        """Epoch days (int64) and rates of the observations in [first, last]."""
+        days = self.data[0]
+        lo = int(np.searchsorted(days, first, side="left"))
+        hi = int(np.searchsorted(days, last, side="right"))
+        return days[lo:hi].astype(np.int64), np.array(self.data[1, lo:hi])
+
+    def rate_before(self, day: int) -> float:
+        """The last rate observed before `day` (NaN if there is none)."""
+        i = int(np.searchsorted(self.data[0], day, side="left"))
+        return float(self.data[1, i - 1]) if i else np.nan
+
+
+class FxRateEngine:
+    """Historical rates per currency pair, read from `<BUY><SELL>.npy` files in `directory`.
+
+    Series and their weekly, monthly and quarterly rollups are memory-mapped
+    on first use and kept open until their file is replaced (e.g. by an
+    `--append` from another process), which is checked on every access.
+    Rollups are written with the series, and `append` recomputes only the
+    periods from the earliest new observation on. A lookup serves whole
+    periods inside the range from the rollup and re-aggregates just the two
+    partial edge periods from daily data, so its cost does not grow with the
+    width of the range. Pairs without a file are derived once as cross rates of
+    their two legs against a base currency and kept in memory, with their
+    rollups, until either leg file is replaced.
+    """
+
+    def __init__(self, directory: str | Path = FX_RATES_DIR, bases: list[str] | None = None):
+        self.directory = Path(directory)
+        self.series: dict[str, RateSeries] = {}
+        self.rollups: dict[tuple[str, str], np.ndarray] = {}
+        # File -> its `file_stamp` when it was memory-mapped
+        self.stamps: dict[Path, tuple[int, int]] = {}
+        self.bases = bases if bases is not None else FX_CROSS_BASES
+        # Derived pair -> (base currency, `file_stamp` of each leg file it was derived from)
+        self.derived: dict[str, tuple[str, dict[Path, tuple[int, int] | None]]] = {}
+
+    def pairs(self) -> list[str]:
+        return sorted(p.stem for p in self.directory.glob("*.npy") if len(p.stem) == 6)
+
+    def get(self, currency_pair: str) -> RateSeries | None:
+        """The pair's series: its own file if there is one, else cross rates through a base currency."""
+        key = pair_key(currency_pair)
+        path = self.directory / f"{key}.npy"
+        stamp = file_stamp(path)
+        if stamp is None:
+            return self.derive(key)
+        if key in self.derived:
+            self._drop(key)
+        series = self.series.get(key)
+        if series is None or self.stamps.get(path) != stamp:
+            series = self.series[key] = RateSeries.open(path)
+            self.stamps[path] = stamp
+        return series
+
+    def rollup(self, currency_pair: str, level: str) -> np.ndarray:
+        """The ROLLUP_ROWS array of `level`, built from the series if it was never written."""
+        key = pair_key(currency_pair)
+        if key in self.derived and self.derive(key) is not None:
+            # Derived series live in memory only, and so do their rollups
+            rows = self.rollups.get((key, level))
+            if rows is None:
+                data = self.series[key].data
+                rows = self.rollups[(key, level)] = rollup(data[0].astype(np.int64), data[1], level)
+            return rows
+        path = self.directory / f"{key}.{level}.npy"
+        stamp = file_stamp(path)
+        if stamp is None:
+            self._update_rollups(key, None)
+            stamp = file_stamp(path)
+        rows = self.rollups.get((key, level))
+        if rows is None or self.stamps.get(path) != stamp:
+            rows = self.rollups[(key, level)] = np.load(path, mmap_mode="r")
+            self.stamps[path] = stamp
+        return rows
+
+    def base_legs(self, base: str) -> dict[str, tuple[str, bool]]:
+        """Currency -> (pair file, inverted) quoting it against `base`, preferring <BASE><CCY> files."""
+        legs: dict[str, tuple[str, bool]] = {}
+        pairs = self.pairs()
+        for pair in pairs:
+            if pair[:3] == base:
+                legs[pair[3:]] = (pair, False)
+        for pair in pairs:
+            if pair[3:] == base and pair[:3] not in legs:
+                legs[pair[:3]] = (pair, True)
+        return legs
+
+    def cross_base(self, key: str) -> tuple[str, dict[str, tuple[str, bool]]] | None:
+        """The first base in FX_CROSS_BASES quoting both currencies of `key`, with its legs."""
+        for base in self.bases:
+            legs = self.base_legs(base)
+            if all(c == base or c in legs for c in (key[:3], key[3:])):
+                return base, legs
+        return None
+
+    def leg_quotes(self, legs: dict[str, tuple[str, bool]], currency: str, days: np.ndarray) -> np.ndarray:
+        """Units of `currency` per unit of the base on each of `days` (1 for the base itself).
+
+        Each leg's last known rate carries forward; before its first observation
+        the quote is NaN. Only the leg observations at or before `days` are read.
+        """
+        if currency not in legs:
+            return np.ones(len(days))
+        pair, inverted = legs[currency]
+        leg = self.get(pair).data
+        i = np.searchsorted(leg[0], days, side="right") - 1
+        rates = np.where(i >= 0, leg[1][np.maximum(i, 0)], np.nan)
+        return 1.0 / rates if inverted else rates
+
+    def cross_series(self, key: str, legs: dict[str, tuple[str, bool]]) -> RateSeries:
+        """Cross rates of `key` from its two legs, on the union of their observation days.
+
+        The rate on each day is `quotes[sell] / quotes[buy]`, with both legs'
+        quotes carried forward. Days before either leg's first observation are
+        left out. Only the two leg files are read.
+        """
+        buy, sell = key[:3], key[3:]
+        days = functools.reduce(
+            np.union1d, (self.get(legs[c][0]).data[0] for c in (buy, sell) if c in legs), np.empty(0)
+        )
+        rates = self.leg_quotes(legs, sell, days) / self.leg_quotes(legs, buy, days)
+        known = np.isfinite(rates)
+        return RateSeries(np.vstack([days[known], rates[known]]))
+
+    def derive(self, key: str) -> RateSeries | None:
+        """The cached cross rates of `key`, derived again if a leg file was replaced (None if no base quotes both)."""
+        if key in self.derived:
+            base, stamps = self.derived[key]
+            if all(file_stamp(path) == stamp for path, stamp in stamps.items()):
+                return self.series[key]
+            self._drop(key)
+        cross = self.cross_base(key)
+        if cross is None:
+            return None
+        base, legs = cross
+        series = self.series[key] = self.cross_series(key, legs)
+        paths = [self.directory / f"{legs[c][0]}.npy" for c in (key[:3], key[3:]) if c in legs]
+        self.derived[key] = (base, {path: self.stamps.get(path) for path in paths})
+        return series
+
+    def _drop(self, key: str) -> None:
+        """Forget a derived series and its rollups."""
+        self.derived.pop(key, None)
+        self.series.pop(key, None)
+        for level in ROLLUP_LEVELS:
+            self.rollups.pop((key, level), None)
+
+    def write(self, currency_pair: str, days: Any, rates: Any) -> RateSeries:
+        """Replace the pair's observations and rebuild its rollups."""
+        key = pair_key(currency_pair)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        series = self.series[key] = RateSeries.write(self.directory / f"{key}.npy", days, rates)
+        self._update_rollups(key, None)
+        return series
+
+    def append(self, currency_pair: str, days: Any, rates: Any) -> RateSeries:
+        """Add observations (replacing existing ones on the same days) and update the rollups
+        from the first affected period on."""
+        key = pair_key(currency_pair)
+        days = np.asarray(days, dtype=np.float64)
+        if not len(days):
+            return self.get(key)
+        series = self.get(key) if (self.directory / f"{key}.npy").exists() else None
+        if series is None:
+            return self.write(key, days, rates)
+        self.series[key] = RateSeries.write(
+            self.directory / f"{key}.npy",
+            np.concatenate([series.data[0], days]),
+            np.concatenate([series.data[1], np.asarray(rates, dtype=np.float64)]),
+        )
+        self._update_rollups(key, int(days.min()))
+        return self.series[key]
+
+    def _update_rollups(self, key: str, since: int | None) -> None:
+        """Recompute every rollup level from the period containing `since` (all periods if None)."""
+        series = self.get(key)
+        days = series.data[0]
+        for level in ROLLUP_LEVELS:
+            path = self.directory / f"{key}.{level}.npy"
+            kept = np.empty((len(ROLLUP_ROWS), 0))
+            start = None
+            if since is not None and path.exists():
+                existing = np.load(path, mmap_mode="r")
+                since_key = period_keys([since], level)[0]
+                kept = existing[:, existing[KEY] < since_key]
+                start = period_start(since_key, level)
+            i = int(np.searchsorted(days, start, side="left")) if start is not None else 0
+            prev_rate = float(series.data[1, i - 1]) if i else np.nan
+            tail = rollup(days[i:].astype(np.int64), np.array(series.data[1, i:]), level, prev_rate)
+            save_array(path, np.hstack([kept, tail]))
+            self.rollups.pop((key, level), None)
+
+    def count_points(self, currency_pair: str, first: int, last: int, granularity: str) -> int:
+        """How many points `granularity` has in [first, last], by binary search only."""
+        if granularity == "daily":
+            days = self.get(currency_pair).data[0]
+        else:
+            days = self.rollup(currency_pair, granularity)[KEY]
+            first, last = period_keys([first, last], granularity)
+        return int(np.searchsorted(days, last, side="right") - np.searchsorted(days, first, side="left"))
+
+    def choose_granularity(self, currency_pair: str, first: int, last: int, max_points: int) -> str:
+        """The finest granularity with at most `max_points` points in the range (quarterly if none has)."""
+        for granularity in GRANULARITIES[:-1]:
+            if self.count_points(currency_pair, first, last, granularity) <= max_points:
+                return granularity
+        return GRANULARITIES[-1]
+
+    def rollup_range(self, currency_pair: str, first: int, last: int, level: str) -> np.ndarray:
+        """ROLLUP_ROWS of `level` for the observations in [first, last].
+
+        Like the stored rollups, each period counts the daily return from the
+        observation before it, even when that observation is outside the range.
+        """
+        series = self.get(currency_pair)
+        first_key, last_key = (int(k) for k in period_keys([first, last], level))
+        head_last = min(last, period_start(first_key + 1, level) - 1)
+        head = rollup(*series.range(first, head_last), level, series.rate_before(first))
+        if first_key == last_key:
+            return head
+        stored = self.rollup(currency_pair, level)
+        lo = int(np.searchsorted(stored[KEY], first_key + 1, side="left"))
+        hi = int(np.searchsorted(stored[KEY], last_key, side="left"))
+        tail_first = period_start(last_key, level)
+        tail = rollup(*series.range(tail_first, last), level, series.rate_before(tail_first))
+        return np.hstack([head, stored[:, lo:hi], tail])
+
+    def lookup(
+        self, currency_pair: str, date_range: str, granularity: str = "auto", max_points: int = FX_MAX_POINTS
+    ) -> dict[str, Any]:
+        """Rates of `currency_pair` over `date_range` ("YYYY/MM/DD-YYYY/MM/DD").
+
+        Daily points are `{"date", "rate"}`; weekly, monthly and quarterly
+        points are OHLC with mean and volatility, dated on the period start.
+        `granularity="auto"` picks the finest level with at most `max_points`
+        points. Pairs without a series are cross rates through a base currency,
+        named in "crossVia". Raises ValueError for a malformed pair, range or
+        granularity, and KeyError if there are no rates for the pair.
+        """
+        first, last = parse_date_range(date_range)
+        granularity = granularity.lower()
+        if granularity not in GRANULARITIES and granularity != "auto":
+            raise ValueError(f"Invalid granularity {granularity!r}; use auto or one of {', '.join(GRANULARITIES)}")
+        series = self.get(currency_pair)
+        if series is None:
+            raise KeyError(f"No rates for {currency_pair}")
+        if granularity == "auto":
+            granularity = self.choose_granularity(currency_pair, first, last, max_points)
+        if granularity == "daily":
+            days, rates = series.range(first, last)
+            points = [{"date": format_date(d), "rate": round(float(r), 6)} for d, r in zip(days, rates)]
+        else:
+            points = rollup_points(self.rollup_range(currency_pair, first, last, granularity), granularity)
+        key = pair_key(currency_pair)
+        result = {"currencyPair": f"{key[:3]}/{key[3:]}", "granularity": granularity, "rates": points}
+        if key in self.derived:
+            result["crossVia"] = self.derived[key][0]
+        return result
+
+
+def read_rates_csv(path: str | Path) -> dict[str, tuple[list[int], list[float]]]:
+    """Read `date,pair,rate` rows (dates as YYYY-MM-DD, YYYY/MM/DD or DD-Mon-YYYY) per pair."""
+    observations: dict[str, tuple[list[int], list[float]]] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            days, rates = observations.setdefault(pair_key(row["pair"]), ([], []))
+            days.append(parse_day(row["date"]))
+            rates.append(float(row["rate"]))
+    return observations
+
+
+def generate_rates(years: int, seed: int = 0, end: str = "2025-06-30") -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Generate business-day random-walk rates against USD for every currency in CURRENCIES.
+
+    Each pair is stored in both directions (USDCAD and CADUSD).
+    """
+    rng = np.random.default_rng(seed)
+    last = parse_day(end)
+    days = np.arange(last - 365 * years, last + 1)
+    # Skip Saturdays and Sundays (epoch day 2 was a Saturday)
+    days = days[(days - 2) % 7 >= 2]
+    series: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for currency in CURRENCIES:
+        if currency == "USD":
+            continue
+        start = rng.uniform(0.5, 150.0)
+        rates = start * np.exp(np.cumsum(rng.normal(0.0, 0.004, len(days))))
+        series[f"USD{currency}"] = (days, rates)
+        series[f"{currency}USD"] = (days, 1.0 / rates)
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build memory-mapped FX rate series for ForeignExchangeLookup")
+    parser.add_argument("rates_dir", nargs="?", default=FX_RATES_DIR, help="Directory to write <PAIR>.npy files to")
+    parser.add_argument("--csv", help="date,pair,rate CSV to ingest (synthetic rates are generated without it)")
+    parser.add_argument("--append", action="store_true", help="Add to existing series instead of replacing them")
+    parser.add_argument("--years", type=int, default=20, help="Years of synthetic history")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    engine = FxRateEngine(args.rates_dir)
+    observations = read_rates_csv(args.csv) if args.csv else generate_rates(args.years, args.seed)
+    for pair, (days, rates) in observations.items():
+        (engine.append if args.append else engine.write)(pair, days, rates)
+    total = sum(len(engine.get(pair)) for pair in observations)
+    print(f"Wrote {len(observations)} pairs ({total} observations) to {args.rates_dir}")
+
+
+if __name__ == "__main__":
+    main()
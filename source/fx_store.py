@@ -0,0 +1,293 @@
+import argparse
+import datetime
+import json
+import random
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from .models import FxTransaction
+from .serialization import loads
+
+EPOCH = datetime.date(1970, 1, 1)
+# Epoch day of a missing or unparseable date; sorts before every real date
+MISSING_DAY = np.iinfo(np.int32).min
+NO_CONTRACT = "No Contract"
+
+# Columns kept as integer codes into a per-column table of distinct values
+CATEGORY_FIELDS = ("companyName", "settlementStatus", "productType", "channel", "buyCurrency", "sellCurrency")
+DATE_FIELDS = ("valueDate", "tradeDate")
+AMOUNT_FIELDS = ("buyCurrencyAmount", "sellCurrencyAmount")
+DATE_FORMATS = ("%d-%b-%Y", "%Y-%m-%d", "%Y/%m/%d")
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def parse_day(value: str) -> int:
+    """Parse a date ("08-May-2025", "2025-05-08" or "2025/05/08") to days since 1970-01-01.
+
+    Raises ValueError if the date is in none of those formats.
+    """
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return (datetime.datetime.strptime(value, fmt).date() - EPOCH).days
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date {value!r}; use YYYY-MM-DD, YYYY/MM/DD or DD-Mon-YYYY")
+
+
+def format_day(day: int) -> str:
+    """Inverse of `parse_day`, in the wire format ("08-May-2025")."""
+    return (EPOCH + datetime.timedelta(days=int(day))).strftime("%d-%b-%Y")
+
+
+def parse_amount(value: Any) -> float:
+    """Amount or rate as a float; NaN for "No Contract" and other non-numbers."""
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def normalize_pair(value: str) -> str:
+    """"usd/cad", "USD-CAD" and "USDCAD" all become "USD/CAD"."""
+    value = value.strip().upper().replace("-", "/")
+    if "/" not in value and len(value) == 6:
+        value = f"{value[:3]}/{value[3:]}"
+    return value
+
+
+def index_key(field: str, value: str) -> str:
+    return normalize_pair(value) if field == "currencyPair" else value.strip().casefold()
+
+
+def postings(codes: np.ndarray, size: int) -> list[np.ndarray]:
+    """Row ids per code, each in ascending order, from one stable sort of the codes."""
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(size + 1))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(size)]
+
+
+class FxTransactionStore:
+    """In-memory FX transaction book with columnar arrays and secondary indexes.
+
+    Filterable and aggregatable fields are held column-wise: categorical fields
+    as int32 codes into `categories[field]`, dates as int32 epoch days and
+    amounts as float64 (NaN for "No Contract"). `indexes` maps each normalized
+    settlementStatus, companyName and "BUY/SELL" currency pair to the ascending
+    row ids that have it, and each date column has a sort order for range
+    lookups, so `select` intersects index entries instead of scanning rows.
+    Full transactions stay in `records` (by row id) for responses.
+    """
+
+    def __init__(self, transactions: Iterable[dict[str, Any] | FxTransaction]):
+        self.records = [t if isinstance(t, FxTransaction) else FxTransaction.from_wire(t) for t in transactions]
+        size = len(self.records)
+
+        self.categories: dict[str, list[str]] = {}
+        self.codes: dict[str, np.ndarray] = {}
+        for field in CATEGORY_FIELDS:
+            self.categories[field], self.codes[field] = self._encode(getattr(r, field) or "" for r in self.records)
+
+        self.days: dict[str, np.ndarray] = {}
+        for field in DATE_FIELDS:
+            # Dates repeat heavily, so each distinct string is parsed once
+            values, codes = self._encode(getattr(r, field) or "" for r in self.records)
+            self.days[field] = np.array([self._day_or_missing(v) for v in values], dtype=np.int32)[codes]
+        self.amounts = {
+            field: np.fromiter((parse_amount(getattr(r, field)) for r in self.records), dtype=np.float64, count=size)
+            for field in AMOUNT_FIELDS
+        }
+
+        self.indexes: dict[str, dict[str, np.ndarray]] = {}
+        for field in ("companyName", "settlementStatus"):
+            self.indexes[field] = self._index(field, self.categories[field], self.codes[field])
+        sell_size = max(len(self.categories["sellCurrency"]), 1)
+        pair_codes = self.codes["buyCurrency"] * sell_size + self.codes["sellCurrency"]
+        pairs = [f"{buy}/{sell}" for buy in self.categories["buyCurrency"] for sell in self.categories["sellCurrency"]]
+        self.indexes["currencyPair"] = self._index("currencyPair", pairs, pair_codes)
+
+        self.all_rows = np.arange(size)
+        self.date_order = {field: np.argsort(days, kind="stable") for field, days in self.days.items()}
+        self.sorted_days = {field: self.days[field][order] for field, order in self.date_order.items()}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _encode(values: Iterable[str]) -> tuple[list[str], np.ndarray]:
+        """Distinct values in first-seen order, and each row's code into them."""
+        table: dict[str, int] = {}
+        codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int32)
+        return list(table), codes
+
+    @staticmethod
+    def _day_or_missing(value: str) -> int:
+        try:
+            return parse_day(value)
+        except ValueError:
+            return MISSING_DAY
+
+    @staticmethod
+    def _index(field: str, values: list[str], codes: np.ndarray) -> dict[str, np.ndarray]:
+        index: dict[str, np.ndarray] = {}
+        for value, rows in zip(values, postings(codes, len(values))):
+            if not len(rows):
+                continue
+            key = index_key(field, value)
+            # Values differing only in case share one entry
+            index[key] = np.union1d(index[key], rows) if key in index else rows
+        return index
+
+    @classmethod
+    def load(cls, path: str | Path) -> "FxTransactionStore":
+        """Load transactions from a JSON Lines file, or a JSON list / `{"result": [...]}` response."""
+        text = Path(path).read_text(encoding="utf-8")
+        if Path(path).suffix == ".jsonl":
+            return cls(loads(line) for line in text.splitlines() if line.strip())
+        data = loads(text)
+        if isinstance(data, dict):
+            data = data.get("result", [data] if "transactionId" in data else [])
+        return cls(data)
+
+    def lookup(self, field: str, value: str | None) -> np.ndarray | None:
+        """Ascending row ids whose `field` is `value`; None when `value` is empty or 'All' (no filter)."""
+        if not value or value.strip().casefold() == "all":
+            return None
+        return self.indexes[field].get(index_key(field, value), EMPTY_ROWS)
+
+    def date_bounds(self, first: str | None, last: str | None) -> tuple[int, int]:
+        """Inclusive epoch-day bounds; an open end excludes rows without a date."""
+        return (
+            parse_day(first) if first else MISSING_DAY + 1,
+            parse_day(last) if last else np.iinfo(np.int32).max,
+        )
+
+    def date_range(self, field: str, first: int, last: int) -> np.ndarray:
+        """Ascending row ids whose `field` date lies in [first, last]."""
+        sorted_days = self.sorted_days[field]
+        lo = np.searchsorted(sorted_days, first, side="left")
+        hi = np.searchsorted(sorted_days, last, side="right")
+        return np.sort(self.date_order[field][lo:hi])
+
+    def select(
+        self,
+        settlement_status: str | None = None,
+        company_name: str | None = None,
+        currency_pair: str | None = None,
+        value_date_from: str | None = None,
+        value_date_to: str | None = None,
+        trade_date_from: str | None = None,
+        trade_date_to: str | None = None,
+    ) -> np.ndarray:
+        """Ascending row ids of the transactions matching every given filter.
+
+        Equality filters are index lookups, intersected smallest first. Date
+        ranges use the date sort order when no equality filter is given, and
+        are otherwise applied to the (already narrowed) candidate rows. Raises
+        ValueError for an unparseable date.
+        """
+        candidates = [
+            rows for rows in (
+                self.lookup("settlementStatus", settlement_status),
+                self.lookup("companyName", company_name),
+                self.lookup("currencyPair", currency_pair),
+            ) if rows is not None
+        ]
+        ranges = [
+            (field, *self.date_bounds(first, last))
+            for field, first, last in (
+                ("valueDate", value_date_from, value_date_to),
+                ("tradeDate", trade_date_from, trade_date_to),
+            ) if first or last
+        ]
+        if not candidates:
+            if not ranges:
+                return self.all_rows
+            field, first, last = ranges.pop(0)
+            candidates.append(self.date_range(field, first, last))
+
+        candidates.sort(key=len)
+        rows = candidates[0]
+        for other in candidates[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        for field, first, last in ranges:
+            days = self.days[field][rows]
+            rows = rows[(days >= first) & (days <= last)]
+        return rows
+
+    def transactions(self, rows: Iterable[int]) -> list[FxTransaction]:
+        return [self.records[i] for i in rows]
+
+
+COMPANIES = ["FXOL 8TEST", "Acme Imports", "Northwind Traders", "Globex Corp", "Initech", "Umbrella Holdings",
+             "Stark Industries", "Wayne Enterprises", "Cyberdyne Systems", "Tyrell Corp"]
+CURRENCIES = ["USD", "CAD", "EUR", "GBP", "JPY", "AUD", "CHF", "MXN"]
+STATUSES = ["Approved", "Pending Approval", "Rejected", "Netted", "Uninstructed"]
+PRODUCT_TYPES = ["FXSPOT", "FXFWD", "FXSWAP"]
+CHANNELS = ["FX Online", "API", "Phone"]
+
+
+def generate_transactions(count: int, seed: int = 0, start: str = "2023-01-01", days: int = 900) -> list[dict[str, Any]]:
+    """Generate `count` transactions shaped like GetForeignExchangeTransactionData results."""
+    rng = random.Random(seed)
+    first_day = parse_day(start)
+    transactions: list[dict[str, Any]] = []
+    for n in range(count):
+        buy, sell = rng.sample(CURRENCIES, 2)
+        trade_day = first_day + rng.randrange(days)
+        status = rng.choice(STATUSES)
+        contracted = status in ("Approved", "Netted")
+        rate = rng.uniform(0.5, 1.5)
+        amount = rng.uniform(50, 1_000_000)
+        transactions.append({
+            "transactionId": str(90_000_000 + n),
+            "companyName": rng.choice(COMPANIES),
+            "valueDate": format_day(trade_day + rng.choice((0, 1, 2))),
+            "tradeDate": format_day(trade_day),
+            "allInRate": f"{rate:.6f}" if contracted else NO_CONTRACT,
+            "buyCurrency": buy,
+            "buyCurrencyAmount": f"{amount:.2f}",
+            "sellCurrency": sell,
+            "sellCurrencyAmount": f"{amount * rate:.2f}" if contracted else NO_CONTRACT,
+            "spotRate": f"{rate:.6f}" if contracted else NO_CONTRACT,
+            "forwardPoints": f"{rng.uniform(-50, 50):.2f}" if contracted else NO_CONTRACT,
+            "productType": rng.choice(PRODUCT_TYPES),
+            "channel": rng.choice(CHANNELS),
+            "settlementStatus": status,
+            "templateDTO": {"beneName": "Name", "beneAccountNo": str(rng.randrange(100, 1000))},
+            "accountDTO": {
+                "accountType": "MCA",
+                "accountNumber": f"xx{rng.randrange(1000, 10000)}",
+                "bankName": "Wells Fargo Bank",
+                "swiftCode": None,
+            },
+            "historyDTO": [
+                {
+                    "date": format_day(trade_day),
+                    "time": "04:15:52 am ET",
+                    "activity": "Instructions submitted by FX Online user",
+                },
+            ],
+        })
+    return transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic FX transaction book for the FX server")
+    parser.add_argument("output", help="JSON Lines file to write (point FX_TRANSACTIONS_PATH at it)")
+    parser.add_argument("--count", type=int, default=100_000, help="Number of transactions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, "w", encoding="utf-8") as f:
+        for transaction in generate_transactions(args.count, args.seed):
+            f.write(json.dumps(transaction) + "\n")
+    print(f"Wrote {args.count} transactions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
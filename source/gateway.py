@@ -0,0 +1,81 @@
+import argparse
+import importlib
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from .deploy import SERVERS
+from .metrics import metrics_endpoint
+from .tracing import configure_tracing
+
+GATEWAY_PORT = 8010
+
+
+def create_gateway(stateless: bool = False) -> Starlette:
+    """Mount every MCP server's streamable-HTTP app under `/<name>` in one Starlette app.
+
+    Starlette does not run the lifespans of mounted apps, so the gateway's own
+    lifespan opens each server's `server_lifespan` (if any) and session manager,
+    and closes them in reverse order on shutdown. `GET /health` reports on all
+    servers at once, and `GET /metrics` serves the metrics of all of them.
+    """
+    modules = {name: importlib.import_module(module) for name, (module, _) in SERVERS.items()}
+    configure_tracing("mcp-gateway")
+    running: set[str] = set()
+
+    routes: list[Route | Mount] = []
+    for name, module in modules.items():
+        module.mcp.settings.stateless_http = stateless
+        module.mcp.settings.json_response = stateless
+        routes.append(Mount(f"/{name}", app=module.mcp.streamable_http_app()))
+
+    async def health(request: Request) -> JSONResponse:
+        servers = {
+            name: {
+                "status": "ok" if name in running else "down",
+                "tools": len(await module.mcp.list_tools()),
+            }
+            for name, module in modules.items()
+        }
+        healthy = len(running) == len(modules)
+        return JSONResponse(
+            {"status": "ok" if healthy else "degraded", "servers": servers},
+            status_code=200 if healthy else 503,
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with AsyncExitStack() as stack:
+            for name, module in modules.items():
+                server_lifespan = getattr(module, "server_lifespan", None)
+                if server_lifespan is not None:
+                    await stack.enter_async_context(server_lifespan(module.mcp))
+                await stack.enter_async_context(module.mcp.session_manager.run())
+                running.add(name)
+            stack.callback(running.clear)
+            yield
+
+    return Starlette(routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/metrics", metrics_endpoint, methods=["GET"]),
+            *routes,
+        ], lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve all MCP servers from one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=GATEWAY_PORT)
+    parser.add_argument("--stateless", action="store_true", help="Use stateless JSON streamable HTTP")
+    args = parser.parse_args()
+    print(f"Serving {', '.join(f'/{name}/mcp' for name in SERVERS)} on {args.host}:{args.port}")
+    uvicorn.run(create_gateway(stateless=args.stateless), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
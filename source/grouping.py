@@ -0,0 +1,78 @@
+import os
+import zlib
+from typing import Any
+
+from .rerank import TOKEN_PATTERN
+
+# Near-duplicate detection settings
+SHINGLE_SIZE = 3
+DUPLICATE_SIMILARITY = float(os.getenv("SEARCH_DUPLICATE_SIMILARITY", "0.8"))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[int]:
+    """Hashed word shingles of `text` (one shingle for texts shorter than `size` words)."""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) <= size:
+        return {zlib.crc32(" ".join(tokens).encode())} if tokens else set()
+    return {zlib.crc32(" ".join(tokens[i : i + size]).encode()) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def group_key(record: dict[str, Any]) -> tuple:
+    """Document and page a hit belongs to; `file_id` wins because chunks of one file may carry different document ids."""
+    document = record.get("file_id") or record.get("document_id") or record.get("book") or record.get("chunk_id")
+    return document, record.get("page_number")
+
+
+def group_hits(result: Any, similarity: float = DUPLICATE_SIMILARITY) -> Any:
+    """Collapse hits into one hit per document page.
+
+    Hits are visited in score order. Snippets that are near-duplicates (shingle
+    Jaccard similarity >= `similarity`) of a snippet already kept are dropped,
+    and the rest are merged into the page's `raw_context`. Each grouped hit keeps
+    the record and score of its best hit, plus `chunk_ids` and `hit_count`.
+    Pages whose snippets were all duplicates are dropped. Results without hits
+    (e.g. errors) are returned unchanged.
+    """
+    hits = result.get("result", {}).get("hits") if isinstance(result, dict) else None
+    if not isinstance(hits, list) or not hits:
+        return result
+
+    groups: dict[tuple, dict[str, Any]] = {}
+    snippets: dict[tuple, list[str]] = {}
+    with_context: set[tuple] = set()
+    kept_shingles: list[set[int]] = []
+    for hit in sorted(hits, key=lambda h: -h.get("rerank_score", h.get("score", 0.0))):
+        record = hit.get("record", {})
+        key = group_key(record)
+        if key not in groups:
+            groups[key] = {**hit, "record": dict(record), "chunk_ids": [], "hit_count": 0}
+            snippets[key] = []
+        group = groups[key]
+        group["hit_count"] += 1
+        if record.get("chunk_id") is not None:
+            group["chunk_ids"].append(record["chunk_id"])
+
+        context = record.get("raw_context") or ""
+        if not context:
+            continue
+        with_context.add(key)
+        fingerprint = shingles(context)
+        if any(jaccard(fingerprint, seen) >= similarity for seen in kept_shingles):
+            continue
+        kept_shingles.append(fingerprint)
+        snippets[key].append(context)
+
+    grouped = []
+    for key, group in groups.items():
+        if key in with_context:
+            if not snippets[key]:
+                continue
+            group["record"]["raw_context"] = "\n".join(snippets[key])
+        grouped.append(group)
+    return {**result, "result": {**result["result"], "hits": grouped}}
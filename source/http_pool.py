@@ -0,0 +1,73 @@
+import importlib.util
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+# Pool configuration (override through the environment)
+POOL_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_POOL_MAX_KEEPALIVE", "20"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_POOL_KEEPALIVE_EXPIRY", "30.0"))
+CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5.0"))
+READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "30.0"))
+WRITE_TIMEOUT = float(os.getenv("UPSTREAM_WRITE_TIMEOUT", "10.0"))
+POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5.0"))
+# HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 keep-alive without it.
+HTTP2_ENABLED = os.getenv("UPSTREAM_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+
+class SharedHTTPClient:
+    """One keep-alive `httpx.AsyncClient` shared by every MCP session of a server.
+
+    The pool lives as long as the process, not a client session, so clients
+    that open a session per tool call still reuse connections. It is created
+    on first use; an app that owns it (deploy, gateway) holds `lifespan()` to
+    close it at shutdown.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = POOL_KEEPALIVE_EXPIRY,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        write_timeout: float = WRITE_TIMEOUT,
+        pool_timeout: float = POOL_TIMEOUT,
+        http2: bool = HTTP2_ENABLED,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        )
+        self.http2 = http2
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the open client, creating it if needed."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pool and drop all keep-alive connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Hold the pool open for the life of an app, closing it when the app shuts down."""
+        try:
+            yield self.client
+        finally:
+            await self.aclose()
@@ -0,0 +1,154 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+
+
+class LimitExceeded(Exception):
+    """Raised when a call waited longer than `max_queue_wait` for a slot."""
+
+
+class AIMDLimiter:
+    """Adaptive concurrency limit using additive increase / multiplicative decrease.
+
+    Latencies are judged per window of calls (`min_samples`, or the current
+    limit if larger), not per call, so ordinary jitter does not shrink the
+    limit. At the end of a window its median latency is compared with a
+    long-term baseline, which drops to any lower window median and otherwise
+    rises towards it by `baseline_smoothing` per window. A median above `latency_tolerance` times
+    the baseline shrinks the limit once by `decrease_factor`; otherwise the
+    limit grows by `increase`. A call failing with an explicit overload signal
+    (`is_overload`, e.g. 429/503) shrinks the limit immediately. Calls over the
+    limit queue in FIFO order for up to `max_queue_wait` seconds before
+    `LimitExceeded` is raised.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_queue_wait: float = 5.0,
+        is_overload: Callable[[BaseException], bool] | None = None,
+        min_samples: int = 10,
+        baseline_smoothing: float = 0.05,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_queue_wait = max_queue_wait
+        self.is_overload = is_overload or (lambda exc: True)
+        self.min_samples = min_samples
+        self.baseline_smoothing = baseline_smoothing
+        # Latencies of the current window, and the long-term median latency
+        self.window: list[float] = []
+        self.baseline: float | None = None
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.increases = 0
+        self.decreases = 0
+        self.rejected = 0
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> None:
+        """Wait for a slot, raising `LimitExceeded` after `max_queue_wait` seconds."""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.max_queue_wait)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        if waiter.cancelled():
+            self.rejected += 1
+            raise LimitExceeded(f"no upstream slot within {self.max_queue_wait}s (limit {int(self.limit)})")
+
+    def release(self, latency: float | None = None, overloaded: bool = False) -> None:
+        """Free a slot and adjust the limit from the call's outcome.
+
+        Pass `latency=None` for calls that ended without a usable signal (e.g. cancelled).
+        """
+        if overloaded:
+            self._decrease()
+        elif latency is not None:
+            self.window.append(latency)
+            if len(self.window) >= max(self.min_samples, int(self.limit)):
+                self._end_window()
+        self._release_slot()
+
+    def _end_window(self) -> None:
+        """Adjust the limit once from the window's median latency, then fold it into the baseline."""
+        median = statistics.median(self.window)
+        self.window.clear()
+        if self.baseline is not None and median > self.baseline * self.latency_tolerance:
+            self._decrease()
+        else:
+            self.limit = min(self.limit + self.increase, self.max_limit)
+            self.increases += 1
+        if self.baseline is None or median < self.baseline:
+            self.baseline = median
+        else:
+            # Rising slowly keeps latency that grows with the limit from becoming the new normal
+            self.baseline += self.baseline_smoothing * (median - self.baseline)
+
+    def _decrease(self) -> None:
+        self.limit = max(self.limit * self.decrease_factor, self.min_limit)
+        self.decreases += 1
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the body of the block, timing it to adapt the limit."""
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if self.is_overload(e):
+                self.release(overloaded=True)
+            else:
+                self.release(time.perf_counter() - started)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> dict[str, Any]:
+        """State and counters for observability."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "baseline_latency": self.baseline,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,223 @@
+import argparse
+import importlib
+import json
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from .models import HitRecord, SearchHit
+from .rerank import TOKEN_PATTERN
+from .serialization import loads
+
+CHUNKS_FILE = "chunks.jsonl"
+EMBEDDINGS_FILE = "embeddings.npy"
+# Which embedder produced the index: {"embedder": <name or null>, "dim": ..., "chunks": ...}
+META_FILE = "index.json"
+HASHING_EMBEDDER = "hashing"
+
+Embedder = Callable[[list[str]], np.ndarray]
+
+
+class HashingEmbedder:
+    """Dependency-free bag-of-words embedder using signed feature hashing.
+
+    Used when an export carries no model embeddings. An index built from model
+    embeddings must be queried with an embedder for the same model instead.
+    """
+
+    name = HASHING_EMBEDDER
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                h = zlib.crc32(token.encode())
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
+
+
+def embedder_name(embedder: Embedder) -> str:
+    """An embedder's `name` attribute (the model it embeds with), or its class name."""
+    return getattr(embedder, "name", None) or type(embedder).__name__
+
+
+def load_embedder(spec: str) -> Embedder:
+    """Import a query embedder from "module:attribute".
+
+    The attribute is an embedder (a function or instance), or a class that is
+    instantiated without arguments. Give it a `name` equal to the model the
+    index was built with.
+    """
+    module, _, attribute = spec.partition(":")
+    if not module or not attribute:
+        raise ValueError(f"Invalid embedder {spec!r}; use module:attribute")
+    target = getattr(importlib.import_module(module), attribute)
+    return target() if isinstance(target, type) else target
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """In-process cosine-similarity index over exported search chunks.
+
+    Embeddings live in one contiguous float32 matrix, persisted as `.npy` and
+    memory-mapped on load so startup does not read the whole file. Hits use the
+    same schema as the TachyonSearchAPI: `{"score": ..., "record": {...}}`.
+    """
+
+    def __init__(self, records: list[dict[str, Any] | HitRecord], embeddings: np.ndarray, embedder: Embedder):
+        if embeddings.ndim != 2 or len(records) != embeddings.shape[0]:
+            raise ValueError("embeddings must be a 2-D matrix with one row per record")
+        # Slotted records with interned metadata take a fraction of the memory of dicts
+        self.records = [r if isinstance(r, HitRecord) else HitRecord.from_wire(r) for r in records]
+        self.embeddings = embeddings
+        self.embedder = embedder
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def build(
+        cls,
+        chunks: Iterable[dict[str, Any]],
+        index_dir: str | Path,
+        embedder: Embedder | None = None,
+        model: str | None = None,
+    ) -> "LocalVectorIndex":
+        """Persist an index with `write_index` and open it with `embedder` for queries."""
+        write_index(chunks, index_dir, embedder, model)
+        return cls.load(index_dir, embedder)
+
+    @classmethod
+    def load(cls, index_dir: str | Path, embedder: Embedder | None = None) -> "LocalVectorIndex":
+        """Open a persisted index, memory-mapping its embedding matrix.
+
+        Queries must be embedded like the index. Hashed indexes get a
+        `HashingEmbedder` by default; an index of model embeddings needs an
+        `embedder`, whose `name` must match the model if one was recorded.
+        Raises ValueError otherwise, or if the index has no metadata (rebuild it).
+        """
+        index_dir = Path(index_dir)
+        meta_path = index_dir / META_FILE
+        if not meta_path.exists():
+            raise ValueError(f"{index_dir} has no {META_FILE}; rebuild it with python -m source.local_index")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        built_with = meta.get("embedder")
+        if embedder is None:
+            if built_with != HASHING_EMBEDDER:
+                raise ValueError(
+                    f"{index_dir} holds {built_with or 'model'} embeddings; configure a query embedder for that model"
+                )
+            embedder = HashingEmbedder(meta["dim"])
+        elif built_with is not None and embedder_name(embedder) != built_with:
+            raise ValueError(
+                f"{index_dir} holds {built_with!r} embeddings but the query embedder is {embedder_name(embedder)!r}"
+            )
+        embeddings = np.load(index_dir / EMBEDDINGS_FILE, mmap_mode="r")
+        with open(index_dir / CHUNKS_FILE, encoding="utf-8") as f:
+            records = [loads(line) for line in f if line.strip()]
+        return cls(records, embeddings, embedder)
+
+    def search(self, query: str, top_k: int = 10) -> list[dict[str, Any]]:
+        """Return the `top_k` most similar chunks as hits (all chunks if `top_k` <= 0)."""
+        if not self.records:
+            return []
+        vector = np.asarray(self.embedder([query]), dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.embeddings.shape[1]:
+            raise ValueError(
+                f"query embedding has {vector.shape[0]} dimensions, index has {self.embeddings.shape[1]}"
+            )
+        norm = np.linalg.norm(vector)
+        scores = self.embeddings @ (vector / norm if norm else vector)
+        k = len(scores) if top_k <= 0 else min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [SearchHit(float(scores[i]), self.records[i]).to_wire() for i in top]
+
+    def search_result(self, query: str, top_k: int = 10) -> dict[str, Any]:
+        """`search` wrapped in the TachyonSearchAPI response envelope."""
+        return {"result": {"hits": self.search(query, top_k)}}
+
+
+def write_index(
+    chunks: Iterable[dict[str, Any]],
+    index_dir: str | Path,
+    embedder: Embedder | None = None,
+    model: str | None = None,
+) -> dict[str, Any]:
+    """Write an index of exported chunks to `index_dir` and return its metadata.
+
+    Each chunk is either a hit (`{"record": {...}, "embedding": [...]}`) or a
+    flat record with an optional `embedding` key. Either every chunk carries an
+    embedding (from `model`, recorded so `load` can insist on a matching query
+    embedder) or none does, and all are embedded from their `title` and
+    `raw_context` with `embedder` (hashing by default). Mixing the two raises
+    ValueError, since the vectors would not be comparable.
+    """
+    records: list[dict[str, Any]] = []
+    vectors: list[Any] = []
+    for chunk in chunks:
+        record = dict(chunk.get("record", chunk))
+        embedding = record.pop("embedding", None)
+        if embedding is None:
+            embedding = chunk.get("embedding")
+        records.append(record)
+        vectors.append(embedding)
+    missing = sum(vector is None for vector in vectors)
+    if 0 < missing < len(vectors):
+        raise ValueError(
+            f"{missing} of {len(vectors)} chunks have no embedding; export every chunk with its model "
+            "embedding, or none so the index embeds them all"
+        )
+    if missing:
+        embedder = embedder or HashingEmbedder()
+        texts = [f"{r.get('title', '')} {r.get('raw_context', '')}" for r in records]
+        vectors = list(embedder(texts))
+        model = embedder_name(embedder)
+    matrix = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(records), -1))
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    np.save(index_dir / EMBEDDINGS_FILE, np.ascontiguousarray(matrix))
+    with open(index_dir / CHUNKS_FILE, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    meta = {"embedder": model, "dim": int(matrix.shape[1]), "chunks": len(records)}
+    (index_dir / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+    return meta
+
+
+def read_chunks(path: str | Path) -> list[dict[str, Any]]:
+    """Read exported chunks from a JSON Lines file or a JSON search response/list."""
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix == ".jsonl":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    data = json.loads(text)
+    if isinstance(data, dict):
+        return data.get("result", {}).get("hits", [])
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a local vector index from exported search chunks")
+    parser.add_argument("export", help="Exported chunks (.jsonl, or .json list / search response)")
+    parser.add_argument("index_dir", help="Directory to write the index to")
+    parser.add_argument("--model", help="Model that produced the export's embeddings (queries must use the same)")
+    args = parser.parse_args()
+    meta = write_index(read_chunks(args.export), args.index_dir, model=args.model)
+    print(f"Indexed {meta['chunks']} chunks ({meta['dim']} dimensions, {meta['embedder'] or 'model'} embeddings) "
+          f"into {args.index_dir}")
+
+
+if __name__ == "__main__":
+    main()
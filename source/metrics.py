@@ -0,0 +1,397 @@
+import asyncio
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+from mcp.server.fastmcp import FastMCP
+from opentelemetry.trace import StatusCode
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from .serialization import dumps_bytes, encode_tool_result, loads
+from .tracing import configure_tracing, server_span
+
+# Directory where each worker process publishes its metrics, so that whichever worker
+# serves /metrics reports all of them (`python -m source.deploy --workers N` sets it);
+# unset, /metrics reports the serving process only
+METRICS_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+# Most often a worker rewrites its published metrics
+METRICS_PUBLISH_SECONDS = float(os.getenv("METRICS_PUBLISH_SECONDS", "1"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def fresh(self) -> "_Metric":
+        """An empty metric of the same kind, to merge the published series of every worker into."""
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+    def snapshot(self) -> list[list[Any]]:
+        """Each series as `[label values, value]`, JSON-encodable for other processes."""
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def merge(self, series: list[list[Any]]) -> None:
+        """Add series from a `snapshot` to this metric's values."""
+        with self._lock:
+            for key, value in series:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge; across workers, values are summed unless `per_process`, which reports each worker's by pid."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, per_process: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.per_process = per_process
+        self._values: dict[LabelValues, float] = {}
+
+    def fresh(self) -> "Gauge":
+        labelnames = self.labelnames + ("pid",) if self.per_process else self.labelnames
+        return Gauge(self.name, self.documentation, labelnames)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def fresh(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets[:-1])
+
+    def snapshot(self) -> list[list[Any]]:
+        with self._lock:
+            return [[list(k), counts, self._sums[k]] for k, counts in self._counts.items()]
+
+    def merge(self, series: list[list[Any]]) -> None:
+        with self._lock:
+            for key, counts, total in series:
+                key = tuple(key)
+                merged = self._counts.setdefault(key, [0] * len(self.buckets))
+                for i, count in enumerate(counts):
+                    merged[i] += count
+                self._sums[key] = self._sums.get(key, 0.0) + total
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """Process-wide set of metrics rendered in the Prometheus text format.
+
+    With METRICS_DIR set, every worker process publishes its metrics there as
+    `<pid>.json` (see `publish`), and `render` reports the sum over all
+    workers: counters and histograms include workers that have exited, gauges
+    only live ones.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._published_at = -math.inf
+        self._publish_pending = False
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), per_process: bool = False
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, per_process=per_process))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def on_collect(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register `fn` to refresh gauges right before each scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        metrics = self._metrics.values() if METRICS_DIR is None else self._merged()
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def publish(self) -> None:
+        """Write this process's metrics to METRICS_DIR for the other workers' scrapes.
+
+        Called after every tool call. Writes at most once per
+        METRICS_PUBLISH_SECONDS; a skipped write is made once the interval has
+        passed, so the last calls before a quiet spell are not lost.
+        """
+        if METRICS_DIR is None:
+            return
+        wait = self._published_at + METRICS_PUBLISH_SECONDS - time.monotonic()
+        if wait <= 0:
+            self._publish_now()
+        elif not self._publish_pending:
+            self._publish_pending = True
+            asyncio.get_running_loop().call_later(wait, self._publish_now)
+
+    def _publish_now(self) -> None:
+        self._publish_pending = False
+        self._published_at = time.monotonic()
+        for collect in self._collectors:
+            collect()
+        path = Path(METRICS_DIR) / f"{os.getpid()}.json"
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(dumps_bytes({name: metric.snapshot() for name, metric in self._metrics.items()}))
+        os.replace(tmp, path)
+
+    def _merged(self) -> list[_Metric]:
+        """This process's metrics combined with those every other worker published."""
+        merged = {name: metric.fresh() for name, metric in self._metrics.items()}
+        published = {int(p.stem): p for p in Path(METRICS_DIR).glob("*.json") if p.stem.isdigit()}
+        published.pop(os.getpid(), None)
+        snapshots = [(os.getpid(), True, {name: m.snapshot() for name, m in self._metrics.items()})]
+        for pid, path in published.items():
+            try:
+                snapshots.append((pid, pid_alive(pid), loads(path.read_bytes())))
+            except (OSError, ValueError):
+                continue
+        for pid, alive, snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                if isinstance(metric, Gauge):
+                    if not alive:
+                        continue
+                    if metric.per_process:
+                        series = [[key + [str(pid)], value] for key, value in series]
+                merged[name].merge(series)
+        return list(merged.values())
+
+
+REGISTRY = Registry()
+
+TOOL_CALLS = REGISTRY.counter("mcp_tool_calls_total", "MCP tool calls.", ("server", "tool"))
+TOOL_ERRORS = REGISTRY.counter(
+    "mcp_tool_errors_total", "MCP tool calls that raised or returned an error.", ("server", "tool")
+)
+TOOL_LATENCY = REGISTRY.histogram("mcp_tool_duration_seconds", "MCP tool call latency.", ("server", "tool"))
+TOOL_IN_FLIGHT = REGISTRY.gauge("mcp_tool_in_flight", "MCP tool calls currently running.", ("server", "tool"))
+TOOL_RESPONSE_BYTES = REGISTRY.histogram(
+    "mcp_tool_response_bytes", "Serialized MCP tool response size.", ("server", "tool"), buckets=SIZE_BUCKETS
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP request latency.", ("upstream", "status")
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "cache_hit_ratio", "Cache hits / lookups since start.", ("cache",), per_process=True
+)
+CACHE_SIZE = REGISTRY.gauge("cache_entries", "Entries currently in the cache.", ("cache",), per_process=True)
+
+
+def is_error_result(result: Any) -> bool:
+    """Tools in this repo report failures as `{"error": ...}` dicts rather than raising."""
+    return isinstance(result, dict) and ("error" in result or "Error" in result)
+
+
+def watch_cache(name: str, cache: Any) -> None:
+    """Export a cache's hit ratio and size (from its `stats()`) on every scrape."""
+
+    @REGISTRY.on_collect
+    def collect() -> None:
+        stats = cache.stats()
+        CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=name)
+        CACHE_SIZE.set(stats["size"], cache=name)
+
+
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP server whose tools are instrumented as they are registered.
+
+    Every tool added through `@mcp.tool()` (or `add_tool`) records call and
+    error counts, latency and in-flight calls. Dict results are encoded as
+    compact JSON with the fast serializer, and response sizes are measured after
+    serialization; tools therefore advertise no return type. Each call also runs in a span that continues the trace from
+    the HTTP request's `traceparent` header; tracing is configured when the
+    server runs (or by the deploy/gateway app factories), not on import. The
+    server also serves `GET /metrics`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+
+    def run(self, *args, **kwargs) -> None:
+        configure_tracing(self.name)
+        super().run(*args, **kwargs)
+
+    def _request_headers(self) -> Any:
+        """Headers of the HTTP request carrying the current MCP call (empty for stdio)."""
+        try:
+            request = self.get_context().request_context.request
+        except (LookupError, ValueError):
+            return {}
+        return getattr(request, "headers", None) or {}
+
+    def add_tool(self, fn, name: str | None = None, *args, **kwargs) -> None:
+        super().add_tool(self._instrument(fn, name or fn.__name__), name, *args, **kwargs)
+
+    def _instrument(self, fn: Callable[..., Any], tool: str) -> Callable[..., Any]:
+        labels = {"server": self.name, "tool": tool}
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with server_span(f"tool {tool}", self._request_headers(), **{"mcp.server": self.name, "mcp.tool": tool}) as span:
+                TOOL_IN_FLIGHT.inc(**labels)
+                started = time.perf_counter()
+                failed = True
+                try:
+                    result = fn(*args, **kwargs)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    failed = is_error_result(result)
+                    return encode_tool_result(result)
+                finally:
+                    TOOL_LATENCY.observe(time.perf_counter() - started, **labels)
+                    TOOL_IN_FLIGHT.dec(**labels)
+                    TOOL_CALLS.inc(**labels)
+                    if failed:
+                        TOOL_ERRORS.inc(**labels)
+                        span.set_status(StatusCode.ERROR)
+
+        # The wrapper returns pre-encoded JSON text, not the tool's annotated return type, so
+        # it must not advertise that type (FastMCP would otherwise validate it as structured output)
+        signature = inspect.signature(fn)
+        wrapper.__signature__ = signature.replace(return_annotation=inspect.Signature.empty)
+        wrapper.__annotations__ = {k: v for k, v in fn.__annotations__.items() if k != "return"}
+        return wrapper
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]):
+        try:
+            content = await super().call_tool(name, arguments)
+            size = sum(len((getattr(c, "text", None) or "").encode()) for c in content)
+            TOOL_RESPONSE_BYTES.observe(size, server=self.name, tool=name)
+            return content
+        finally:
+            REGISTRY.publish()
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,179 @@
+from sys import intern
+from dataclasses import dataclass, fields
+from typing import Any, ClassVar
+
+_FIELD_NAMES: dict[type, tuple[str, ...]] = {}
+_PLANS: dict[type, dict[str, Any]] = {}
+
+
+class WireModel:
+    """Base for slotted record models whose attribute names are their wire keys.
+
+    `from_wire` interns the strings of `_interned` fields (metadata repeated on
+    many records, so every record shares one copy) and converts `_nested` fields
+    to their models. Keys the model does not declare are kept in `extra`, so
+    `to_wire` returns what was parsed. Models with `_omit_none` leave unset
+    fields out of the wire form.
+    """
+
+    __slots__ = ()
+    _interned: ClassVar[frozenset[str]] = frozenset()
+    _nested: ClassVar[dict[str, type["WireModel"]]] = {}
+    _omit_none: ClassVar[bool] = False
+
+    @classmethod
+    def _field_names(cls) -> tuple[str, ...]:
+        """Declared wire keys, in declaration order."""
+        names = _FIELD_NAMES.get(cls)
+        if names is None:
+            names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(cls) if f.name != "extra")
+        return names
+
+    @classmethod
+    def _plan(cls) -> dict[str, Any]:
+        """Wire key -> how to convert its value: `str` to intern, a model class, or None."""
+        plan = _PLANS.get(cls)
+        if plan is None:
+            plan = _PLANS[cls] = {
+                name: str if name in cls._interned else cls._nested.get(name) for name in cls._field_names()
+            }
+        return plan
+
+    @classmethod
+    def from_wire(cls, data: dict[str, Any]) -> Any:
+        plan = cls._plan()
+        values: dict[str, Any] = {}
+        extra: dict[str, Any] | None = None
+        for key, value in data.items():
+            if key not in plan:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+                continue
+            convert = plan[key]
+            if convert is None or value is None:
+                values[key] = value
+            elif convert is str:
+                values[key] = intern(value) if type(value) is str else value
+            else:
+                values[key] = [convert.from_wire(v) for v in value] if type(value) is list else convert.from_wire(value)
+        return cls(**values, extra=extra)
+
+    def to_wire(self) -> dict[str, Any]:
+        data: dict[str, Any] = {}
+        for key in self._field_names():
+            value = getattr(self, key)
+            if value is None:
+                if self._omit_none:
+                    continue
+            elif key in self._nested:
+                value = [v.to_wire() for v in value] if type(value) is list else value.to_wire()
+            data[key] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+@dataclass(slots=True)
+class HitRecord(WireModel):
+    """Metadata and text of one search chunk (the `record` of a hit)."""
+
+    _interned: ClassVar[frozenset[str]] = frozenset({
+        "usecase_id", "document_id", "file_name", "title", "url", "data_classification",
+        "sor_last_modified", "book", "file_id", "chunk_insert_date",
+    })
+    _omit_none: ClassVar[bool] = True
+
+    chunk_id: str | None = None
+    raw_context: str | None = None
+    title: str | None = None
+    url: str | None = None
+    usecase_id: str | None = None
+    document_id: str | None = None
+    file_name: str | None = None
+    file_id: str | None = None
+    book: str | None = None
+    page_number: int | None = None
+    data_classification: str | None = None
+    sor_last_modified: str | None = None
+    chunk_insert_date: str | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class SearchHit(WireModel):
+    """One TachyonSearchAPI hit: `{"score": ..., "record": {...}}`."""
+
+    _nested: ClassVar[dict[str, type[WireModel]]] = {"record": HitRecord}
+
+    score: float | None = None
+    record: HitRecord | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class AccountDTO(WireModel):
+    _interned: ClassVar[frozenset[str]] = frozenset({"accountType", "bankName", "swiftCode"})
+
+    accountType: str | None = None
+    accountNumber: str | None = None
+    bankName: str | None = None
+    swiftCode: str | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class TemplateDTO(WireModel):
+    _interned: ClassVar[frozenset[str]] = frozenset({"beneName"})
+
+    beneName: str | None = None
+    beneAccountNo: str | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class HistoryEntry(WireModel):
+    _interned: ClassVar[frozenset[str]] = frozenset({"date", "activity"})
+
+    date: str | None = None
+    time: str | None = None
+    activity: str | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class FxTransaction(WireModel):
+    """One FX transaction as returned by GetForeignExchangeTransactionData.
+
+    Amounts and rates stay strings, as on the wire ("No Contract" is a valid value).
+    """
+
+    # Amounts, rates and account numbers are mostly unique per transaction, so they are not interned
+    _interned: ClassVar[frozenset[str]] = frozenset({
+        "companyName", "valueDate", "tradeDate", "buyCurrency", "sellCurrency",
+        "productType", "channel", "settlementStatus",
+    })
+    _nested: ClassVar[dict[str, type[WireModel]]] = {
+        "templateDTO": TemplateDTO,
+        "accountDTO": AccountDTO,
+        "historyDTO": HistoryEntry,
+    }
+
+    transactionId: str | None = None
+    companyName: str | None = None
+    valueDate: str | None = None
+    tradeDate: str | None = None
+    allInRate: str | None = None
+    buyCurrency: str | None = None
+    buyCurrencyAmount: str | None = None
+    sellCurrency: str | None = None
+    sellCurrencyAmount: str | None = None
+    spotRate: str | None = None
+    forwardPoints: str | None = None
+    productType: str | None = None
+    channel: str | None = None
+    settlementStatus: str | None = None
+    templateDTO: TemplateDTO | None = None
+    accountDTO: AccountDTO | None = None
+    historyDTO: list[HistoryEntry] | None = None
+    extra: dict[str, Any] | None = None
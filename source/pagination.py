@@ -0,0 +1,199 @@
+import base64
+import os
+import uuid
+from typing import Any, Callable
+
+import numpy as np
+
+from .cache import SQLiteTTLCache, TTLCache
+from .grouping import group_hits
+from .rerank import rerank_hits
+from .shaping import fit_hits_to_budget, payload_size, response_budget, select_hits, shape_search_result
+
+# How long a result snapshot stays pageable, and how many are kept per process
+PAGE_SNAPSHOT_TTL_SECONDS = float(os.getenv("PAGE_SNAPSHOT_TTL_SECONDS", "120"))
+PAGE_SNAPSHOT_MAX_ENTRIES = int(os.getenv("PAGE_SNAPSHOT_MAX_ENTRIES", "256"))
+# "memory" (per process) or "sqlite" (shared by worker processes); follows the search
+# cache backend, which `python -m source.deploy --workers N` switches to sqlite
+PAGE_SNAPSHOT_BACKEND = os.getenv("PAGE_SNAPSHOT_BACKEND", os.getenv("SEARCH_CACHE_BACKEND", "memory"))
+
+# Row-id snapshots in shared caches are packed as little-endian int32 under ids with this prefix
+PACKED_ROWS_PREFIX = "rows-"
+ROW_ID_DTYPE = np.dtype("<i4")
+
+# Takes one page of items; returns the page as it will be sent and how many items it kept
+PageFitter = Callable[[list[Any]], tuple[Any, int]]
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed, or its snapshot has expired."""
+
+
+class PageTooLarge(ValueError):
+    """A page of the requested size does not fit the response budget."""
+
+
+def encode_cursor(snapshot_id: str, offset: int, page_size: int) -> str:
+    raw = f"{snapshot_id}:{offset}:{page_size}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        snapshot_id, offset, page_size = raw.split(":")
+        return snapshot_id, int(offset), int(page_size)
+    except ValueError as e:
+        raise InvalidCursor("Invalid cursor.") from e
+
+
+# Upper bound on what `"next_cursor": "..."` adds to a page
+CURSOR_RESERVE_BYTES = payload_size({"next_cursor": encode_cursor(uuid.uuid4().hex, 10**9, 10**6)})
+
+
+class Paginator:
+    """Serve a result list page by page from a short-lived snapshot.
+
+    The first page is cut from the full result, and the result is stored under
+    a random snapshot id only when more pages remain. The opaque cursor
+    returned with each page encodes the snapshot id, offset and page size, so
+    later pages are sliced from the snapshot without querying upstream again.
+    An optional `fit` shapes each page and reports how many items it kept;
+    the next cursor starts after those, so items a page had no room for come
+    on the next page. `snapshots` is any cache with `get`/`set` (a `TTLCache`
+    by default; pass a `SQLiteTTLCache` so worker processes share snapshots).
+    Shared caches get integer arrays (e.g. row ids) as a packed int32 blob,
+    so each later page reads only its own slice of the snapshot.
+    """
+
+    def __init__(self, snapshots: Any = None):
+        self.snapshots = snapshots if snapshots is not None else TTLCache(
+            PAGE_SNAPSHOT_MAX_ENTRIES, PAGE_SNAPSHOT_TTL_SECONDS
+        )
+
+    @staticmethod
+    def _cut(items: Any, offset: int, page_size: int, fit: PageFitter | None) -> tuple[Any, int]:
+        page = items[offset:offset + page_size]
+        return fit(page) if fit is not None else (page, len(page))
+
+    def first_page(self, items: Any, page_size: int, fit: PageFitter | None = None) -> tuple[Any, str | None]:
+        """Return the first page of `items` and a cursor for the rest (None if there is no rest)."""
+        page, kept = self._cut(items, 0, page_size, fit)
+        if kept >= len(items):
+            return page, None
+        snapshot_id = uuid.uuid4().hex
+        if not isinstance(self.snapshots, TTLCache) and isinstance(items, np.ndarray):
+            if items.dtype.kind in "iu" and hasattr(self.snapshots, "read"):
+                snapshot_id = PACKED_ROWS_PREFIX + snapshot_id
+                items = np.ascontiguousarray(items, dtype=ROW_ID_DTYPE).tobytes()
+            else:
+                # Shared caches store JSON, so other NumPy arrays go in as lists
+                items = items.tolist()
+        self.snapshots.set(snapshot_id, items)
+        return page, encode_cursor(snapshot_id, kept, page_size)
+
+    def next_page(self, cursor: str, page_size: int = 0, fit: PageFitter | None = None) -> tuple[Any, str | None]:
+        """Return the page at `cursor` and the cursor after it.
+
+        `page_size` overrides the page size of the original request if positive.
+        Raises InvalidCursor if the cursor is malformed or its snapshot expired.
+        """
+        snapshot_id, offset, cursor_page_size = decode_cursor(cursor)
+        size = page_size if page_size > 0 else cursor_page_size
+        if snapshot_id.startswith(PACKED_ROWS_PREFIX):
+            packed = self.snapshots.read(snapshot_id, offset * ROW_ID_DTYPE.itemsize, size * ROW_ID_DTYPE.itemsize)
+            if packed is None:
+                raise InvalidCursor("Cursor has expired; repeat the request without a cursor to start over.")
+            items, total = np.frombuffer(packed[0], dtype=ROW_ID_DTYPE), packed[1] // ROW_ID_DTYPE.itemsize
+            page, kept = self._cut(items, 0, size, fit)
+        else:
+            items = self.snapshots.get(snapshot_id)
+            if items is None:
+                raise InvalidCursor("Cursor has expired; repeat the request without a cursor to start over.")
+            total = len(items)
+            page, kept = self._cut(items, offset, size, fit)
+        end = offset + kept
+        return page, encode_cursor(snapshot_id, end, size) if end < total else None
+
+
+def create_paginator(path: str) -> Paginator:
+    """A Paginator whose snapshots live in SQLite at `path` when PAGE_SNAPSHOT_BACKEND is "sqlite"."""
+    if PAGE_SNAPSHOT_BACKEND == "sqlite":
+        return Paginator(SQLiteTTLCache(path, max_entries=PAGE_SNAPSHOT_MAX_ENTRIES, ttl=PAGE_SNAPSHOT_TTL_SECONDS))
+    return Paginator()
+
+
+def hits_fitter(max_bytes: int | None = None, strict: bool = False) -> PageFitter:
+    """Fit a page of hits, wrapped as a search result, to the response budget.
+
+    Room is left for the `next_cursor`. With `strict` (the first page) a page
+    that cannot keep every hit even without context raises PageTooLarge, so
+    `page_size` is checked against the budget up front; later pages just end
+    early. A page that cannot keep a single hit always raises.
+    """
+    budget = response_budget() if max_bytes is None else max_bytes
+    hits_budget = max(budget - CURSOR_RESERVE_BYTES, 1) if budget > 0 else 0
+
+    def fit(hits: list[dict[str, Any]]) -> tuple[dict[str, Any], int]:
+        result, kept = fit_hits_to_budget({"result": {"hits": hits}}, hits_budget)
+        if (strict and kept < len(hits)) or (hits and not kept):
+            raise PageTooLarge(
+                f"page_size {len(hits)} does not fit the {budget}-byte response budget; "
+                f"use page_size {max(kept, 1)} or less"
+            )
+        return result, kept
+
+    return fit
+
+
+def hits_page(page: dict[str, Any], next_cursor: str | None) -> dict[str, Any]:
+    """A page produced by `hits_fitter`, with its `next_cursor`."""
+    return {**page, "next_cursor": next_cursor}
+
+
+def search_response(
+    paginator: Paginator,
+    result: Any,
+    query: str = "",
+    top_k: int = 0,
+    min_score: float = 0.0,
+    fields: list[str] | None = None,
+    rerank: bool = False,
+    group: bool = False,
+    page_size: int = 0,
+    max_bytes: int | None = None,
+) -> Any:
+    """Turn a search result into a tool response, the same way for every search tool.
+
+    Hits are re-ordered for `query` with `rerank` and collapsed per document
+    page with `group`, then selected by `top_k`, `min_score` and `fields`.
+    With a positive `page_size` the selection is served from `paginator` as a
+    first page with a `next_cursor`; otherwise it is fit to `max_bytes` (the
+    response budget by default). Results without hits (e.g. errors) are
+    returned unchanged.
+    """
+    if rerank:
+        result = rerank_hits(result, query)
+    if group:
+        result = group_hits(result)
+    if page_size <= 0:
+        return shape_search_result(result, top_k=top_k, min_score=min_score, fields=fields, max_bytes=max_bytes)
+    result = select_hits(result, top_k=top_k, min_score=min_score, fields=fields)
+    if not isinstance(result, dict) or "error" in result:
+        return result
+    try:
+        page, next_cursor = paginator.first_page(
+            result.get("result", {}).get("hits", []), page_size, fit=hits_fitter(strict=True)
+        )
+    except PageTooLarge as e:
+        return {"error": str(e)}
+    return hits_page(page, next_cursor)
+
+
+def next_search_page(paginator: Paginator, cursor: str, page_size: int = 0) -> dict[str, Any]:
+    """The page of an earlier search at `cursor` with its `next_cursor`, or an error if the cursor is invalid."""
+    try:
+        page, next_cursor = paginator.next_page(cursor, page_size, fit=hits_fitter())
+    except (InvalidCursor, PageTooLarge) as e:
+        return {"error": str(e)}
+    return hits_page(page, next_cursor)
@@ -0,0 +1,99 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Any
+
+# Fusion settings for the optional re-ranking stage
+RERANK_METHOD = os.getenv("SEARCH_RERANK_METHOD", "rrf")  # "rrf" or "weighted"
+RERANK_LEXICAL_WEIGHT = float(os.getenv("SEARCH_RERANK_LEXICAL_WEIGHT", "0.3"))
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Word tokens; also used for near-duplicate shingles and the local index's hashing embedder
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def bm25_scores(query: str, documents: list[str], k1: float = BM25_K1, b: float = BM25_B) -> list[float]:
+    """BM25 score of each document for `query`, with IDF taken over `documents` themselves."""
+    query_terms = set(tokenize(query))
+    docs = [Counter(tokenize(d)) for d in documents]
+    if not docs or not query_terms:
+        return [0.0] * len(docs)
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1.0
+    idf = {}
+    for term in query_terms:
+        df = sum(1 for d in docs if term in d)
+        idf[term] = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+    scores = []
+    for d in docs:
+        length = sum(d.values())
+        score = 0.0
+        for term in query_terms:
+            tf = d.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def _ranks(scores: list[float]) -> list[int]:
+    """1-based rank of each score, highest first (ties keep input order)."""
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    ranks = [0] * len(scores)
+    for rank, i in enumerate(order, start=1):
+        ranks[i] = rank
+    return ranks
+
+
+def _min_max(scores: list[float]) -> list[float]:
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0 if high > 0 else 0.0] * len(scores)
+    return [(s - low) / (high - low) for s in scores]
+
+
+def fuse_scores(
+    vector: list[float],
+    lexical: list[float],
+    method: str = RERANK_METHOD,
+    lexical_weight: float = RERANK_LEXICAL_WEIGHT,
+) -> list[float]:
+    """Combine vector and lexical scores by reciprocal-rank fusion or weighted min-max fusion."""
+    if method == "rrf":
+        # Hits with no term overlap are absent from the lexical ranking
+        return [
+            1 / (RRF_K + rv) + (1 / (RRF_K + rl) if l > 0 else 0.0)
+            for rv, rl, l in zip(_ranks(vector), _ranks(lexical), lexical)
+        ]
+    if method == "weighted":
+        return [
+            (1 - lexical_weight) * v + lexical_weight * l
+            for v, l in zip(_min_max(vector), _min_max(lexical))
+        ]
+    raise ValueError(f"Unknown rerank method: {method}")
+
+
+def rerank_hits(result: Any, query: str, method: str = RERANK_METHOD) -> Any:
+    """Re-order `result.hits` by fusing the vector `score` with BM25 over `title` and `raw_context`.
+
+    Each hit gains a `rerank_score`; the upstream `score` is kept. Results
+    without hits (e.g. errors) are returned unchanged.
+    """
+    hits = result.get("result", {}).get("hits") if isinstance(result, dict) else None
+    if not isinstance(hits, list) or len(hits) < 2:
+        return result
+    documents = [
+        f"{h.get('record', {}).get('title', '')} {h.get('record', {}).get('raw_context', '')}" for h in hits
+    ]
+    fused = fuse_scores([h.get("score", 0.0) for h in hits], bm25_scores(query, documents), method)
+    ranked = sorted(
+        ({**h, "rerank_score": round(score, 6)} for h, score in zip(hits, fused)),
+        key=lambda h: -h["rerank_score"],
+    )
+    return {**result, "result": {**result["result"], "hits": ranked}}
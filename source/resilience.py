@@ -0,0 +1,231 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+
+class LatencyWindow:
+    """Rolling window of recent call latencies (seconds)."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """Nearest-rank percentile of the window, or None if it is empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+
+class HedgedCaller:
+    """Send a backup attempt when the first one is slower than the recent p95.
+
+    The first attempt to return successfully wins and the other is cancelled.
+    Until `min_samples` latencies are recorded, `initial_delay` is used as the
+    hedge delay.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window_size: int = 200,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow(window_size)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @property
+    def delay(self) -> float:
+        """Seconds to wait for the first attempt before sending the hedge."""
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        return max(self.latencies.percentile(self.percentile), self.min_delay)
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        result = await fn()
+        self.latencies.record(time.perf_counter() - started)
+        return result
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn()`, hedging with a second `fn()` if the first is slow."""
+        self.calls += 1
+        primary = asyncio.ensure_future(self._timed(fn))
+        attempts = [primary]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.delay)
+            if done:
+                return primary.result()
+
+            self.hedged += 1
+            hedge = asyncio.ensure_future(self._timed(fn))
+            attempts.append(hedge)
+            pending = set(attempts)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for observability."""
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "delay": self.delay,
+            "samples": len(self.latencies),
+        }
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for an upstream dependency.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected for `reset_timeout` seconds. It then goes half-open and lets up
+    to `half_open_max_calls` trial calls through: a success closes the circuit,
+    a failure opens it again.
+
+    Every state change starts a new generation. `allow` returns the generation
+    a call was admitted in, and its outcome only counts against that
+    generation: a call admitted before the circuit opened cannot close it, nor
+    can a failure from before half-open re-open it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._half_open_calls = 0
+        self._generation = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._enter(self.HALF_OPEN)
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open circuit goes half-open."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> int | None:
+        """Return the generation a call is admitted in, or None if it is rejected.
+
+        Pass the generation to `record_success`, `record_failure` or `release`
+        when the call ends. Trial calls are counted against the half-open limit.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return self._generation
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return self._generation
+        self.rejected += 1
+        return None
+
+    def release(self, generation: int) -> None:
+        """Give back a trial slot for a call that ended without an outcome (e.g. cancelled)."""
+        if generation == self._generation and self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self, generation: int) -> None:
+        self.successes += 1
+        if generation != self._generation:
+            return
+        self._consecutive_failures = 0
+        if self._state != self.CLOSED:
+            self._enter(self.CLOSED)
+
+    def record_failure(self, generation: int) -> None:
+        self.failures += 1
+        if generation != self._generation:
+            return
+        self._consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._trip()
+
+    def _enter(self, state: str) -> None:
+        self._state = state
+        self._generation += 1
+
+    def _trip(self) -> None:
+        self._enter(self.OPEN)
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def open_error(self, service: str) -> dict[str, Any]:
+        """Structured error returned to callers while the circuit rejects calls."""
+        return {
+            "error": f"{service} is unavailable (circuit {self.state}); failing fast.",
+            "circuit_state": self.state,
+            "retry_after": round(self.retry_after, 3),
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """State and counters for observability."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "retry_after": self.retry_after,
+        }
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Whether an exception indicates an unhealthy upstream (not a bad request)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return True
+
+
+def is_overload_response(exc: BaseException) -> bool:
+    """Whether an exception is the upstream explicitly shedding load (429 or 503)."""
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (429, 503)
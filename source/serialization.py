@@ -0,0 +1,92 @@
+import json
+import os
+from importlib.util import find_spec
+from typing import Any, Callable
+
+# "auto" picks orjson, then msgspec, then the standard library; or force one of "orjson", "msgspec", "json"
+SERIALIZER = os.getenv("TOOL_SERIALIZER", "auto")
+
+
+def _orjson() -> tuple[Callable[..., bytes], Callable[[str | bytes], Any]]:
+    import orjson
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=option)
+
+    return dumps, orjson.loads
+
+
+def _msgspec() -> tuple[Callable[..., bytes], Callable[[str | bytes], Any]]:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=str)
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        data = encoder.encode(obj)
+        return msgspec.json.format(data, indent=2) if indent else data
+
+    def loads(data: str | bytes) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return dumps, loads
+
+
+def _stdlib() -> tuple[Callable[..., bytes], Callable[[str | bytes], Any]]:
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        if indent:
+            return json.dumps(obj, indent=2, ensure_ascii=False, default=str).encode()
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+    return dumps, json.loads
+
+
+BACKENDS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+
+def _select(name: str) -> str:
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown serializer {name!r}, expected one of: auto, {', '.join(BACKENDS)}")
+        return name
+    return next((n for n in ("orjson", "msgspec") if find_spec(n)), "json")
+
+
+BACKEND = _select(SERIALIZER)
+_dumps, _loads = BACKENDS[BACKEND]()
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """Encode `obj` as UTF-8 JSON, compact unless `indent` is set.
+
+    Values JSON cannot represent (datetimes, UUIDs, ...) are encoded with `str`.
+    """
+    return _dumps(obj, indent)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """`dumps_bytes` decoded to a string."""
+    return _dumps(obj, indent).decode()
+
+
+def loads(data: str | bytes) -> Any:
+    """Decode JSON text or bytes, raising ValueError if it is malformed."""
+    return _loads(data)
+
+
+def encode_tool_result(result: Any) -> Any:
+    """Pre-encode a tool's dict (or list of dicts) result as compact JSON text.
+
+    FastMCP would otherwise serialize it indented. Lists of dicts become one
+    JSON array instead of one content item per element. Other results pass
+    through unchanged.
+    """
+    if isinstance(result, dict) or (
+        isinstance(result, (list, tuple)) and result and all(isinstance(item, dict) for item in result)
+    ):
+        return dumps(result)
+    return result
@@ -1,28 +1,143 @@
-from typing import Any
-import httpx
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 from mcp.server.fastmcp import FastMCP
+from opentelemetry.trace import SpanKind
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 import uuid
 from datetime import datetime, timezone
 
+from .cache import SQLiteTTLCache, TTLCache
+from .http_pool import SharedHTTPClient
+from .limiter import AIMDLimiter, LimitExceeded
+from .local_index import LocalVectorIndex, load_embedder
+from .metrics import UPSTREAM_LATENCY, InstrumentedFastMCP, watch_cache
+from .pagination import create_paginator, next_search_page, search_response
+from .resilience import CircuitBreaker, HedgedCaller, is_overload_response, is_upstream_failure
+from .serialization import loads
+from .shaping import response_budget
+from .singleflight import SingleFlight
+from .tracing import current_trace_id, inject_trace_headers, tracer
+
+# Shared keep-alive connection pool for all Tachyon calls
+tachyon_http = SharedHTTPClient()
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Open the Tachyon connection pool for the life of an app, closing it on shutdown.
+
+    Entered once per app by deploy and gateway, not per MCP session: under
+    `mcp.run` the pool is created on first use and kept for the process.
+    """
+    async with tachyon_http.lifespan():
+        yield
+
+
 # Create an MCP server
-mcp = FastMCP(
+mcp = InstrumentedFastMCP(
     name="tachyon-search",
     host="0.0.0.0",  # only used for SSE transport (localhost)
     port=8000,        # only used for SSE transport (set this to any port)
 )
 
 # Constants (placeholders)
-TACHYON_SEARCH_API_URL = "https://placeholder.tachyon.api/search"
+# Point at `python -m source.tachyon_stub` (http://127.0.0.1:8090/search) to run offline
+TACHYON_SEARCH_API_URL = os.getenv("TACHYON_SEARCH_API_URL", "https://placeholder.tachyon.api/search")
 APP_ID = "YOUR_APP_ID"
 API_KEY = "YOUR_API_KEY"
 APIGEE_TOKEN = "YOUR_APIGEE_ACCESS_TOKEN"
 USECASE_ID = "test_search_v1"  # Hardcoded as per requirements
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+# "memory" (per process) or "sqlite" (shared by worker processes through SEARCH_CACHE_PATH)
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite3")
+SEARCH_PAGES_PATH = os.getenv("SEARCH_PAGES_PATH", "search_pages.sqlite3")
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "8"))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "32"))
+SEARCH_CANDIDATE_FACTOR = int(os.getenv("SEARCH_CANDIDATE_FACTOR", "4"))
+# Hits a local index returns when the caller sets no top_k, like a TachyonSearchAPI response
+LOCAL_SEARCH_TOP_K = int(os.getenv("LOCAL_SEARCH_TOP_K", "10"))
+TACHYON_HEDGING_ENABLED = os.getenv("TACHYON_HEDGING", "0") == "1"
+TACHYON_HEDGE_PERCENTILE = float(os.getenv("TACHYON_HEDGE_PERCENTILE", "95"))
+TACHYON_BREAKER_FAILURES = int(os.getenv("TACHYON_BREAKER_FAILURES", "5"))
+TACHYON_BREAKER_RESET_SECONDS = float(os.getenv("TACHYON_BREAKER_RESET_SECONDS", "30"))
+TACHYON_LIMIT_INITIAL = int(os.getenv("TACHYON_LIMIT_INITIAL", "10"))
+TACHYON_LIMIT_MAX = int(os.getenv("TACHYON_LIMIT_MAX", "100"))
+TACHYON_LIMIT_QUEUE_WAIT = float(os.getenv("TACHYON_LIMIT_QUEUE_WAIT", "5"))
+# Use cases served from a local index instead of Tachyon, as "usecase=index_dir,..."
+LOCAL_SEARCH_INDEXES = dict(
+    entry.split("=", 1) for entry in os.getenv("LOCAL_SEARCH_INDEXES", "").split(",") if "=" in entry
+)
+# Query embedders for local indexes built from model embeddings, as "usecase=module:attribute,..."
+LOCAL_SEARCH_EMBEDDERS = dict(
+    entry.split("=", 1) for entry in os.getenv("LOCAL_SEARCH_EMBEDDERS", "").split(",") if "=" in entry
+)
 
-async def make_tachyon_request(query: str) -> dict[str, Any] | None:
-    """Make a request to the TachyonSearchAPI with proper headers and error handling."""
+# Result cache for semantic_search, keyed by (usecase id, normalized query)
+if SEARCH_CACHE_BACKEND == "sqlite":
+    search_cache = SQLiteTTLCache(SEARCH_CACHE_PATH, max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl=SEARCH_CACHE_TTL_SECONDS)
+else:
+    search_cache = TTLCache(max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl=SEARCH_CACHE_TTL_SECONDS)
+watch_cache("search", search_cache)
+# Result snapshots behind semantic_search cursors, shared like the result cache
+search_pages = create_paginator(SEARCH_PAGES_PATH)
+# Identical concurrent queries share one in-flight Tachyon request
+search_flight = SingleFlight()
+# Upstream resilience: optional p95-based hedging and a circuit breaker
+tachyon_hedger = HedgedCaller(percentile=TACHYON_HEDGE_PERCENTILE)
+tachyon_breaker = CircuitBreaker(
+    failure_threshold=TACHYON_BREAKER_FAILURES,
+    reset_timeout=TACHYON_BREAKER_RESET_SECONDS,
+)
+# Adaptive (AIMD) cap on concurrent Tachyon calls
+tachyon_limiter = AIMDLimiter(
+    initial_limit=TACHYON_LIMIT_INITIAL,
+    max_limit=TACHYON_LIMIT_MAX,
+    max_queue_wait=TACHYON_LIMIT_QUEUE_WAIT,
+    is_overload=is_overload_response,
+)
+# Local indexes, opened on first use in a worker thread (once, however many searches wait for it)
+local_indexes: dict[str, LocalVectorIndex] = {}
+local_index_loads = SingleFlight()
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: trimmed, lower-cased, single-spaced."""
+    return " ".join(query.split()).lower()
+
+
+def open_local_index(usecase_id: str) -> LocalVectorIndex:
+    """Load the local index configured for `usecase_id` with its query embedder.
+
+    Raises ValueError if the index needs a query embedder that is missing or
+    does not match the one it was built with, or if its files are malformed,
+    and OSError if they cannot be read.
+    """
+    spec = LOCAL_SEARCH_EMBEDDERS.get(usecase_id)
+    return LocalVectorIndex.load(LOCAL_SEARCH_INDEXES[usecase_id], load_embedder(spec) if spec else None)
+
+
+async def local_index_for(usecase_id: str) -> LocalVectorIndex | None:
+    """Return the local index serving `usecase_id`, or None if it is served remotely."""
+    if usecase_id not in LOCAL_SEARCH_INDEXES:
+        return None
+    index = local_indexes.get(usecase_id)
+    if index is None:
+        index = local_indexes[usecase_id] = await local_index_loads.do(
+            usecase_id, lambda: asyncio.to_thread(open_local_index, usecase_id)
+        )
+    return index
+
+
+async def post_tachyon_request(query: str, correlation_id: str) -> dict[str, Any]:
+    """Send one search request to the TachyonSearchAPI, raising on failure."""
     now = datetime.now(timezone.utc).isoformat()
     request_id = str(uuid.uuid4())
-    correlation_id = str(uuid.uuid4())
     headers = {
         "x-request-id": request_id,
         "x-wf-request-date": now,
@@ -36,25 +151,185 @@ async def make_tachyon_request(query: str) -> dict[str, Any] | None:
         "query": query,
         "usecaseId": USECASE_ID,
     }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(TACHYON_SEARCH_API_URL, json=payload, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": f"Failed to contact TachyonSearchAPI: {str(e)}"}
+    async with tachyon_limiter.slot():
+        with tracer.start_as_current_span(
+            "tachyon.search", kind=SpanKind.CLIENT, attributes={"http.request_id": request_id}
+        ) as span:
+            inject_trace_headers(headers)
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = await tachyon_http.client.post(TACHYON_SEARCH_API_URL, json=payload, headers=headers)
+                status = str(response.status_code)
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - started, upstream="tachyon", status=status)
+                span.set_attribute("http.status_code", status)
+        response.raise_for_status()
+    return loads(response.content)
+
+
+async def make_tachyon_request(query: str) -> dict[str, Any] | None:
+    """Make a request to the TachyonSearchAPI with proper headers and error handling."""
+    generation = tachyon_breaker.allow()
+    if generation is None:
+        return tachyon_breaker.open_error("TachyonSearchAPI")
+    # Reuse the trace id so Tachyon logs can be joined with our traces
+    correlation_id = current_trace_id() or str(uuid.uuid4())
+    try:
+        if TACHYON_HEDGING_ENABLED:
+            result = await tachyon_hedger.call(lambda: post_tachyon_request(query, correlation_id))
+        else:
+            result = await post_tachyon_request(query, correlation_id)
+    except LimitExceeded as e:
+        tachyon_breaker.release(generation)
+        return {"error": f"TachyonSearchAPI is saturated: {str(e)}", "retryable": True}
+    except Exception as e:
+        if is_upstream_failure(e):
+            tachyon_breaker.record_failure(generation)
+        else:
+            tachyon_breaker.record_success(generation)
+        return {"error": f"Failed to contact TachyonSearchAPI: {str(e)}"}
+    except BaseException:
+        tachyon_breaker.release(generation)
+        raise
+    tachyon_breaker.record_success(generation)
+    return result
+
+
+async def cached_search(query: str, use_cache: bool = True) -> dict[str, Any] | None:
+    """Search through the result cache, coalescing identical in-flight queries."""
+    cache_key = (USECASE_ID, normalize_query(query))
+    if use_cache:
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    result = await search_flight.do(cache_key, lambda: make_tachyon_request(query))
+    if result is not None and "error" not in result:
+        search_cache.set(cache_key, result)
+    return result
+
+
+async def run_search(
+    query: str, top_k: int, use_cache: bool = True, rerank: bool = False, group: bool = False
+) -> dict[str, Any] | None:
+    """Route a search to the local index for USECASE_ID if one is configured, else to Tachyon.
+
+    A local index returns `top_k` hits (LOCAL_SEARCH_TOP_K when `top_k` is 0),
+    or a wider candidate set when the caller will `rerank` or `group` the hits,
+    so that `top_k` survives the cut after those (see `search_response`).
+    """
+    try:
+        index = await local_index_for(USECASE_ID)
+        if index is not None:
+            limit = top_k if top_k > 0 else LOCAL_SEARCH_TOP_K
+            candidates = limit * SEARCH_CANDIDATE_FACTOR if rerank or group else limit
+            result = await asyncio.to_thread(index.search_result, query, candidates)
+    except (OSError, ValueError) as e:
+        return {"error": f"Local index for {USECASE_ID} is unavailable: {str(e)}"}
+    if index is None:
+        result = await cached_search(query, use_cache)
+    return result
+
 
 @mcp.tool()
-async def semantic_search(query: str) -> Any:
+async def semantic_search(
+    query: str,
+    top_k: int = 0,
+    min_score: float = 0.0,
+    fields: list[str] | None = None,
+    rerank: bool = False,
+    group_by_document: bool = False,
+    use_cache: bool = True,
+    page_size: int = 0,
+    cursor: str | None = None,
+) -> Any:
     """Perform a semantic search using the TachyonSearchAPI.
 
     Args:
         query: The search input query string.
+        top_k: Maximum number of hits to return (0, the default, returns all hits).
+        min_score: Drop hits scoring below this value.
+        fields: Record fields to return for each hit, e.g. ["title", "raw_context"]. Returns all fields if omitted.
+        rerank: Re-order hits by combining the vector score with keyword matching on title and context.
+        group_by_document: Merge hits from the same document page and drop near-duplicate snippets (off by default).
+        use_cache: Set to false to bypass the result cache and always query the API.
+        page_size: Return at most this many hits plus a `next_cursor` for the rest (0 returns all hits at once).
+        cursor: `next_cursor` from a previous response, to fetch the next page of that search.
     """
+    if cursor:
+        return next_search_page(search_pages, cursor, page_size)
     if not query:
         return {"error": "Query string is required."}
-    result = await make_tachyon_request(query)
-    return result
+    result = await run_search(query, top_k, use_cache, rerank, group_by_document)
+    return search_response(
+        search_pages, result, query, top_k, min_score, fields, rerank, group_by_document, page_size
+    )
+
+
+@mcp.tool()
+async def semantic_search_batch(
+    queries: list[str],
+    top_k: int = 0,
+    min_score: float = 0.0,
+    fields: list[str] | None = None,
+    rerank: bool = False,
+    group_by_document: bool = False,
+    use_cache: bool = True,
+) -> Any:
+    """Perform several semantic searches in one call using the TachyonSearchAPI.
+
+    Queries run concurrently. Failed queries are reported under `errors`
+    while the others are still returned under `results`.
+
+    Args:
+        queries: The search input query strings.
+        top_k: Maximum number of hits to return per query (0, the default, returns all hits).
+        min_score: Drop hits scoring below this value.
+        fields: Record fields to return for each hit, e.g. ["title", "raw_context"]. Returns all fields if omitted.
+        rerank: Re-order hits by combining the vector score with keyword matching on title and context.
+        group_by_document: Merge hits from the same document page and drop near-duplicate snippets (off by default).
+        use_cache: Set to false to bypass the result cache and always query the API.
+    """
+    queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+    if not queries:
+        return {"error": "At least one query string is required."}
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        return {"error": f"At most {SEARCH_BATCH_MAX_QUERIES} queries are allowed per batch."}
+
+    semaphore = asyncio.Semaphore(SEARCH_BATCH_CONCURRENCY)
+
+    async def run(query: str) -> dict[str, Any] | None:
+        async with semaphore:
+            return await run_search(query, top_k, use_cache, rerank, group_by_document)
+
+    outcomes = await asyncio.gather(*(run(q) for q in queries), return_exceptions=True)
+    # The response size budget is shared evenly between the queries
+    max_bytes = response_budget() // len(queries)
+    results: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[query] = f"Search failed: {str(outcome)}"
+        elif outcome is None or "error" in outcome:
+            errors[query] = (outcome or {}).get("error", "No response from TachyonSearchAPI")
+        else:
+            results[query] = search_response(
+                search_pages, outcome, query, top_k, min_score, fields, rerank, group_by_document, max_bytes=max_bytes
+            )
+    return {"results": results, "errors": errors}
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats(request: Request) -> JSONResponse:
+    """Cache, coalescing and upstream resilience counters."""
+    return JSONResponse({
+        "cache": search_cache.stats(),
+        "single_flight": search_flight.stats(),
+        "hedging": {"enabled": TACHYON_HEDGING_ENABLED, **tachyon_hedger.stats()},
+        "circuit_breaker": tachyon_breaker.stats(),
+        "concurrency_limit": tachyon_limiter.stats(),
+    })
+
 
 # Run the server
 if __name__ == "__main__":
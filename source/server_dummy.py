@@ -1,10 +1,13 @@
+import os
 from typing import Any
 import httpx
-from mcp.server.fastmcp import FastMCP
 from starlette.requests import Request
 from starlette.responses import PlainTextResponse
 
-mcp = FastMCP(
+from .metrics import InstrumentedFastMCP
+from .pagination import create_paginator, next_search_page, search_response
+
+mcp = InstrumentedFastMCP(
     name="fisrt-server",
     host="127.0.0.1",
     port=8001,
@@ -12,6 +15,9 @@ mcp = FastMCP(
 
 DUMMY_POST_API_URL = "https://httpbin.org/post"
 
+# Result snapshots behind SemanticSearch cursors (shared through SQLite under multi-worker deploys)
+search_pages = create_paginator(os.getenv("DUMMY_SEARCH_PAGES_PATH", "dummy_search_pages.sqlite3"))
+
 
 async def make_dummy_post_request(data: dict) -> dict:
     """Make a POST request to a dummy endpoint for testing."""
@@ -26,14 +32,32 @@ async def make_dummy_post_request(data: dict) -> dict:
 
 
 @mcp.tool(name="SemanticSearch")
-async def dummy_post_tool(message: str) -> Any:
+async def dummy_post_tool(
+    message: str,
+    top_k: int = 0,
+    min_score: float = 0.0,
+    fields: list[str] | None = None,
+    rerank: bool = False,
+    group_by_document: bool = False,
+    page_size: int = 0,
+    cursor: str | None = None,
+) -> Any:
     """
     Perform a semantic search on the vector database to retrieve data about credit cards.
 
     Args:
         message: Any string to send in the payload.
+        top_k: Maximum number of hits to return (0, the default, returns all hits).
+        min_score: Drop hits scoring below this value.
+        fields: Record fields to return for each hit, e.g. ["title", "raw_context"]. Returns all fields if omitted.
+        rerank: Re-order hits by combining the vector score with keyword matching on title and context.
+        group_by_document: Merge hits from the same document page and drop near-duplicate snippets (off by default).
+        page_size: Return at most this many hits plus a `next_cursor` for the rest (0 returns all hits at once).
+        cursor: `next_cursor` from a previous response, to fetch the next page of that search.
     """
     print("TOOL CALL")
+    if cursor:
+        return next_search_page(search_pages, cursor, page_size)
     try:
         payload = {"message": message}
         dum_response = {
@@ -76,8 +100,9 @@ async def dummy_post_tool(message: str) -> Any:
                 ]
             }
         }
-        print(dum_response)
-        return dum_response
+        return search_response(
+            search_pages, dum_response, message, top_k, min_score, fields, rerank, group_by_document, page_size
+        )
     except:
         return {"Error": "But OK"}
 
@@ -1,17 +1,34 @@
-from typing import Any, Dict, List
+import asyncio
+import os
+from typing import Any, Dict
 import httpx
 from litprinter import lit
-from mcp.server.fastmcp import FastMCP
 from starlette.requests import Request
 from starlette.responses import PlainTextResponse
 
-mcp = FastMCP(
+from .fx_aggregate import aggregate, parse_group_by
+from .fx_rates import FX_MAX_POINTS, FxRateEngine
+from .fx_store import FxTransactionStore
+from .metrics import InstrumentedFastMCP
+from .models import FxTransaction
+from .pagination import InvalidCursor, create_paginator
+from .singleflight import SingleFlight
+
+mcp = InstrumentedFastMCP(
     name="second-server",
     host="127.0.0.1",
     port=8002,
 )
 
 DUMMY_POST_API_URL = "https://httpbin.org/post"
+# Transaction book served by GetForeignExchangeTransactionData (JSON Lines, or a JSON list)
+FX_TRANSACTIONS_PATH = os.getenv("FX_TRANSACTIONS_PATH", "fx_transactions.jsonl")
+
+# Historical rates behind ForeignExchangeLookup (FX_RATES_DIR, memory-mapped per pair)
+fx_rates = FxRateEngine()
+# Result snapshots behind GetForeignExchangeTransactionData cursors (row ids; shared through
+# SQLite as packed int32 blobs under multi-worker deploys, where every worker loads the same book)
+fx_pages = create_paginator(os.getenv("FX_PAGES_PATH", "fx_pages.sqlite3"))
 
 
 async def make_dummy_post_request(data: dict) -> dict:
@@ -26,28 +43,110 @@ async def make_dummy_post_request(data: dict) -> dict:
 
 
 @mcp.tool(name="ForeignExchangeLookup")
-async def dummy_post_tool(currencyCode: str, date_range: str) -> Any:
+async def dummy_post_tool(
+    currencyCode: str, date_range: str, granularity: str = "auto", max_points: int = FX_MAX_POINTS
+) -> Any:
     """
     Look up records for historical foreign exchange data.
 
     Args:
         currencyCode: String containing two currencies in the fashion currency1/currency2. Example: "USD/CAD".
         date_range: String denoting the date range. Example "2023/01/01-2024/01/01".
+        granularity: 'daily' (every observation), or 'weekly', 'monthly' or 'quarterly' (open, high, low, close,
+                     mean and volatility per period). 'auto' picks the finest one with at most `max_points` points.
+        max_points: Most points to return when granularity is 'auto'.
     """
-
-    print("TOOL CALL")
     try:
-        payload = {"ccyPair": currencyCode, "date_range": date_range}
-        print(payload)
-        return payload
-    except:
-        return {"Error": "But OK"}
+        return fx_rates.lookup(currencyCode, date_range, granularity, max_points)
+    except ValueError as e:
+        return {"error": str(e)}
+    except KeyError as e:
+        return {"error": e.args[0]}
+
+
+# Served when FX_TRANSACTIONS_PATH does not exist
+SAMPLE_TRANSACTION = FxTransaction.from_wire({
+    "transactionId": "94806599",
+    "companyName": "FXOL 8TEST",
+    "valueDate": "08-May-2025",
+    "tradeDate": "07-May-2025",
+    "allInRate": "No Contract",
+    "buyCurrency": "CAD",
+    "buyCurrencyAmount": "50.00",
+    "sellCurrency": "USD",
+    "sellCurrencyAmount": "No Contract",
+    "spotRate": "No Contract",
+    "forwardPoints": "No Contract",
+    "productType": "FXSPOT",
+    "channel": "FX Online",
+    "settlementStatus": "Rejected",
+    "templateDTO": {"beneName": "Name", "beneAccountNo": "213"},
+    "accountDTO": {
+        "accountType": "MCA",
+        "accountNumber": "xx1414",
+        "bankName": "Wells Fargo Bank",
+        "swiftCode": None,
+    },
+    "historyDTO": [
+        {
+            "date": "08-May-2025",
+            "time": "08:18:41 am ET",
+            "activity": "Instructions rejected by Venky Dapulil<br /><b>Reject Reason: </b>Reject",
+        },
+        {
+            "date": "07-May-2025",
+            "time": "04:15:52 am ET",
+            "activity": "Instructions submitted by Sai Sreekanth T",
+        },
+    ],
+})
+
+
+# Served whatever the filters, as the API stub it stands in for did
+SAMPLE_STORE = FxTransactionStore([SAMPLE_TRANSACTION])
+
+# The transaction store, loaded on first use in a worker thread (once, however many calls wait for it)
+_fx_store: FxTransactionStore | None = None
+fx_store_loads = SingleFlight()
+
+
+def open_fx_store() -> FxTransactionStore:
+    """Load and index FX_TRANSACTIONS_PATH, or the sample store if it does not exist."""
+    if os.path.exists(FX_TRANSACTIONS_PATH):
+        return FxTransactionStore.load(FX_TRANSACTIONS_PATH)
+    return SAMPLE_STORE
+
+
+async def fx_store() -> FxTransactionStore:
+    """The transaction store, loaded and indexed off the event loop on first use."""
+    global _fx_store
+    if _fx_store is None:
+        _fx_store = await fx_store_loads.do(FX_TRANSACTIONS_PATH, lambda: asyncio.to_thread(open_fx_store))
+    return _fx_store
+
+
+def select_rows(store: FxTransactionStore, settlement_status: str, **filters: str | None):
+    """Row ids of the transactions in `store` matching the filters ("Settled" means "Approved").
+
+    The sample store is returned whole. Raises ValueError for an unparseable date.
+    """
+    if store is SAMPLE_STORE:
+        return store.all_rows
+    if settlement_status.lower() == "settled":
+        settlement_status = "Approved"
+    return store.select(settlement_status=settlement_status, **filters)
 
 
 @mcp.tool(name="GetForeignExchangeTransactionData")
 async def get_foreign_exchange_transaction_data(
     settlement_status: str = "Approved",
-) -> List[Dict[str, Any]]:
+    company_name: str | None = None,
+    currency_pair: str | None = None,
+    value_date_from: str | None = None,
+    value_date_to: str | None = None,
+    page_size: int = 0,
+    cursor: str | None = None,
+) -> Dict[str, Any]:
     """
     Retrieve Foreign Exchange Transaction Data for a specific Company ID and settlement status.
     Provides the company details, currency amount details, channels, account details,
@@ -63,57 +162,85 @@ async def get_foreign_exchange_transaction_data(
                            - 'Rejected'
                            - 'Netted'
                            - 'Uninstructed'
+        company_name: Only transactions of this company (optional).
+        currency_pair: Only transactions buying the first and selling the second currency, e.g. "CAD/USD" (optional).
+        value_date_from: Earliest value date, e.g. "2025-05-01" (optional).
+        value_date_to: Latest value date, inclusive (optional).
+        page_size: Return at most this many transactions plus a `next_cursor` (0 returns all at once).
+        cursor: `next_cursor` from a previous response, to fetch the next page of those transactions.
 
     Returns:
-        List of transaction data dictionaries
+        `{"result": [...]}` with the matching transaction data dictionaries
     """
     lit("GetForeignExchangeFXTransactionData")
-    company_id: str = "SITCOMP2"
-    value_date: str = "NA"
-    if settlement_status.lower() == "settled":
-        settlement_status = "Approved"
-    payload = {
-        "companyId": company_id,
-        "valueDate": value_date,
-        "settlement_status": settlement_status,
-    }
-    sample_response_for_get_transactions = {
-        "transactionId": "94806599",
-        "companyName": "FXOL 8TEST",
-        "valueDate": "08-May-2025",
-        "tradeDate": "07-May-2025",
-        "allInRate": "No Contract",
-        "buyCurrency": "CAD",
-        "buyCurrencyAmount": "50.00",
-        "sellCurrency": "USD",
-        "sellCurrencyAmount": "No Contract",
-        "spotRate": "No Contract",
-        "forwardPoints": "No Contract",
-        "productType": "FXSPOT",
-        "channel": "FX Online",
-        "settlementStatus": "Rejected",
-        "templateDTO": {"beneName": "Name", "beneAccountNo": "213"},
-        "accountDTO": {
-            "accountType": "MCA",
-            "accountNumber": "xx1414",
-            "bankName": "Wells Fargo Bank",
-            "swiftCode": None,
-        },
-        "historyDTO": [
-            {
-                "date": "08-May-2025",
-                "time": "08:18:41 am ET",
-                "activity": "Instructions rejected by Venky Dapulil<br /><b>Reject Reason: </b>Reject",
-            },
-            {
-                "date": "07-May-2025",
-                "time": "04:15:52 am ET",
-                "activity": "Instructions submitted by Sai Sreekanth T",
-            },
-        ],
-    }
-    response = sample_response_for_get_transactions
-    return response
+    store = await fx_store()
+    if cursor:
+        try:
+            rows, next_cursor = fx_pages.next_page(cursor, page_size)
+        except InvalidCursor as e:
+            return {"error": str(e)}
+        return {"result": [t.to_wire() for t in store.transactions(rows)], "next_cursor": next_cursor}
+    try:
+        rows = select_rows(
+            store,
+            settlement_status,
+            company_name=company_name,
+            currency_pair=currency_pair,
+            value_date_from=value_date_from,
+            value_date_to=value_date_to,
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    if page_size > 0:
+        # Snapshots hold row ids only; transactions are converted per page
+        rows, next_cursor = fx_pages.first_page(rows, page_size)
+        return {"result": [t.to_wire() for t in store.transactions(rows)], "next_cursor": next_cursor}
+    return {"result": [t.to_wire() for t in store.transactions(rows)]}
+
+
+@mcp.tool(name="AggregateForeignExchangeTransactions")
+async def aggregate_foreign_exchange_transactions(
+    group_by: str = "settlementStatus",
+    bucket: str | None = None,
+    settlement_status: str = "All",
+    company_name: str | None = None,
+    currency_pair: str | None = None,
+    value_date_from: str | None = None,
+    value_date_to: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Summarize Foreign Exchange Transactions per group instead of listing them.
+    Use this for totals, counts, averages or breakdowns; each result row holds the group values,
+    `count`, and the count, sum, min, max and average of buy and sell amounts.
+
+    Args:
+        group_by: Comma-separated fields to group by, any of: settlementStatus, productType, channel,
+                  buyCurrency, sellCurrency, currencyPair, companyName. Empty for one overall row.
+                  Amounts in different currencies are summed as-is, so include a currency field for totals.
+        bucket: Also group by period of valueDate: 'daily', 'weekly', 'monthly' or 'quarterly' (optional).
+                Each period's valueDate is its first day, e.g. "01-May-2025".
+        settlement_status: Only transactions with this status ('All' for every status).
+        company_name: Only transactions of this company (optional).
+        currency_pair: Only transactions buying the first and selling the second currency, e.g. "CAD/USD" (optional).
+        value_date_from: Earliest value date, e.g. "2025-05-01" (optional).
+        value_date_to: Latest value date, inclusive (optional).
+
+    Returns:
+        `{"result": [...]}` with one row per group
+    """
+    store = await fx_store()
+    try:
+        rows = select_rows(
+            store,
+            settlement_status,
+            company_name=company_name,
+            currency_pair=currency_pair,
+            value_date_from=value_date_from,
+            value_date_to=value_date_to,
+        )
+        return {"result": aggregate(store, rows, parse_group_by(group_by), bucket.lower() if bucket else None)}
+    except ValueError as e:
+        return {"error": str(e)}
 
 
 # Add a custom GET /health route for health checks
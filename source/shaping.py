@@ -0,0 +1,157 @@
+import os
+import re
+from typing import Any
+
+from .serialization import dumps_bytes
+
+# Server-wide cap on the (approximate) serialized size of a search response
+MAX_RESPONSE_BYTES = int(os.getenv("SEARCH_MAX_RESPONSE_BYTES", "16000"))
+MAX_RESPONSE_TOKENS = int(os.getenv("SEARCH_MAX_RESPONSE_TOKENS", "0"))  # 0 disables the token cap
+BYTES_PER_TOKEN = 4  # rough estimate for English text
+
+# Latin terminators need trailing whitespace; CJK ones ("。", "！", "？") are not followed by a space
+SENTENCE_END = re.compile(r"[.!?](?=\s|$)|[。！？]")
+ELLIPSIS = "..."
+
+
+def response_budget(max_bytes: int = MAX_RESPONSE_BYTES, max_tokens: int = MAX_RESPONSE_TOKENS) -> int:
+    """Effective byte budget from the byte cap and the optional token cap."""
+    budgets = [b for b in (max_bytes, max_tokens * BYTES_PER_TOKEN) if b > 0]
+    return min(budgets) if budgets else 0
+
+
+def payload_size(data: Any) -> int:
+    """Size in bytes of `data` as compact JSON."""
+    return len(dumps_bytes(data))
+
+
+def text_size(text: str) -> int:
+    """Size in bytes of `text` as a JSON string, without the quotes."""
+    return payload_size(text) - 2
+
+
+def _fitting_prefix(text: str, max_bytes: int) -> str:
+    """Longest prefix of `text` whose JSON string takes at most `max_bytes`."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if text_size(text[:mid]) <= max_bytes:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def truncate_at_sentence(text: str, max_bytes: int) -> str:
+    """Cut `text` to at most `max_bytes` as a JSON string, ending on a sentence boundary when possible.
+
+    Sizes are encoded bytes, so multi-byte (e.g. CJK) text and escapes count in full.
+    """
+    if text_size(text) <= max_bytes:
+        return text
+    window = _fitting_prefix(text, max_bytes)
+    ends = [m.end() for m in SENTENCE_END.finditer(window)]
+    if ends:
+        return window[: ends[-1]]
+    if max_bytes <= len(ELLIPSIS):
+        return ""
+    window = _fitting_prefix(text, max_bytes - len(ELLIPSIS))
+    cut = window.rfind(" ")
+    return (window[:cut] if cut > 0 else window).rstrip() + ELLIPSIS
+
+
+def _hits(result: Any) -> list | None:
+    if not isinstance(result, dict):
+        return None
+    hits = result.get("result", {}).get("hits")
+    return hits if isinstance(hits, list) else None
+
+
+def _with_hits(result: dict[str, Any], hits: list) -> dict[str, Any]:
+    return {**result, "result": {**result["result"], "hits": hits}}
+
+
+def select_hits(
+    result: Any,
+    top_k: int | None = None,
+    min_score: float | None = None,
+    fields: list[str] | None = None,
+) -> Any:
+    """Keep the first `top_k` hits scoring at least `min_score`, projecting `record` to `fields`.
+
+    Results without a `result.hits` list (e.g. errors) are returned unchanged.
+    """
+    hits = _hits(result)
+    if hits is None:
+        return result
+    if min_score is not None:
+        hits = [h for h in hits if h.get("score", 0.0) >= min_score]
+    if top_k is not None and top_k > 0:
+        hits = hits[:top_k]
+    if fields:
+        hits = [
+            {**h, "record": {k: v for k, v in h.get("record", {}).items() if k in fields}}
+            for h in hits
+        ]
+    return _with_hits(result, hits)
+
+
+def fit_to_budget(result: Any, max_bytes: int) -> Any:
+    """Shrink a search result to about `max_bytes` of JSON (see `fit_hits_to_budget`)."""
+    return fit_hits_to_budget(result, max_bytes)[0]
+
+
+def fit_hits_to_budget(result: Any, max_bytes: int) -> tuple[Any, int]:
+    """Shrink a search result to about `max_bytes` of JSON, and count the hits kept.
+
+    `raw_context` is truncated at sentence boundaries, giving every hit an
+    equal share of the remaining budget (short contexts pass their unused share
+    on). Shares are in encoded bytes, so non-ASCII context stays within the
+    budget. If the hits do not fit even without context, trailing hits are
+    dropped; the count tells callers (e.g. pagination) where the kept hits end.
+    """
+    hits = _hits(result)
+    if hits is None:
+        return result, 0
+    if max_bytes <= 0 or payload_size(result) <= max_bytes:
+        return result, len(hits)
+
+    hits = [{**h, "record": dict(h.get("record", {}))} for h in hits]
+    contexts = [h["record"].get("raw_context") or "" for h in hits]
+    for h in hits:
+        if "raw_context" in h["record"]:
+            h["record"]["raw_context"] = ""
+    overhead = payload_size(_with_hits(result, hits))
+    while hits and overhead > max_bytes:
+        hits.pop()
+        contexts.pop()
+        overhead = payload_size(_with_hits(result, hits))
+
+    remaining = max_bytes - overhead
+    allotment = [0] * len(hits)
+    order = sorted(range(len(hits)), key=lambda i: len(contexts[i]))
+    for position, i in enumerate(order):
+        share = remaining // (len(order) - position)
+        allotment[i] = min(text_size(contexts[i]), share)
+        remaining -= allotment[i]
+    for h, context, size in zip(hits, contexts, allotment):
+        if "raw_context" in h["record"]:
+            h["record"]["raw_context"] = truncate_at_sentence(context, size)
+    shaped = _with_hits(result, hits)
+    # Allotments are exact, so this only drops hits if the encoder's sizes are not additive
+    while hits and payload_size(shaped) > max_bytes:
+        hits.pop()
+        shaped = _with_hits(result, hits)
+    return shaped, len(hits)
+
+
+def shape_search_result(
+    result: Any,
+    top_k: int | None = None,
+    min_score: float | None = None,
+    fields: list[str] | None = None,
+    max_bytes: int | None = None,
+) -> Any:
+    """Apply hit selection, field projection and the response size budget."""
+    shaped = select_hits(result, top_k=top_k, min_score=min_score, fields=fields)
+    return fit_to_budget(shaped, response_budget() if max_bytes is None else max_bytes)
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from .local_index import HashingEmbedder, LocalVectorIndex, normalize_rows
+from .serialization import dumps_bytes
+
+STUB_PORT = 8090
+# Headers post_tachyon_request sends on every call
+REQUIRED_HEADERS = ("x-request-id", "x-correlation-id", "x-wf-client-id", "x-wf-api-key", "authorization")
+
+TOPICS = {
+    "Economics Special Commentary": "inflation rates outlook growth recession labor market consumer spending gdp",
+    "Credit Card Benefits Guide": "rewards cashback travel points annual fee balance transfer apr credit limit",
+    "Foreign Exchange Weekly": "usd cad eur gbp jpy currency spot forward hedging volatility central bank",
+    "Mortgage Market Update": "mortgage refinance housing prices loan rates fixed adjustable closing costs",
+    "Small Business Banking": "payroll treasury deposits lending cash flow merchant services business credit",
+    "Wealth Management Perspectives": "portfolio equities bonds allocation retirement income dividend yield risk",
+}
+FILLER = "the a for and with of in on to as from market client quarter year report analysts expect".split()
+
+LatencySampler = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> LatencySampler:
+    """Parse a latency distribution in seconds.
+
+    Supported forms: `fixed:0.05`, `uniform:0.02,0.2`, `exponential:0.1` (mean)
+    and `lognormal:0.08,0.5` (median, sigma).
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    try:
+        if kind == "fixed":
+            (delay,) = values
+            return lambda rng: delay
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high)
+        if kind == "exponential":
+            (mean,) = values
+            return lambda rng: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        if kind == "lognormal":
+            median, sigma = values
+            return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+
+def generate_corpus(size: int, usecase_id: str = "test_search_v1", seed: int = 0) -> list[dict[str, Any]]:
+    """Generate `size` chunk records shaped like TachyonSearchAPI hit records.
+
+    Chunks belong to documents of up to 8 pages with 1-4 chunks per page, so
+    grouping and de-duplication have realistic input.
+    """
+    rng = random.Random(seed)
+    records: list[dict[str, Any]] = []
+    while len(records) < size:
+        title, vocabulary = rng.choice(list(TOPICS.items()))
+        words = vocabulary.split()
+        file_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        book = str(uuid.UUID(int=rng.getrandbits(128)))
+        url = f"https://research.example.com/links/pdf/{book}"
+        for page in range(1, rng.randint(1, 8) + 1):
+            for _ in range(rng.randint(1, 4)):
+                text = " ".join(rng.choice(words if rng.random() < 0.6 else FILLER) for _ in range(rng.randint(20, 80)))
+                records.append({
+                    "usecase_id": usecase_id,
+                    "document_id": url,
+                    "chunk_id": f"{rng.getrandbits(80):020x}",
+                    "raw_context": f"{title}. {text.capitalize()}.",
+                    "file_name": f"{book}.pdf",
+                    "title": f"{title} - {url}",
+                    "data_classification": "internal",
+                    "sor_last_modified": "2025-05-17T00:01:53.551391",
+                    "book": book,
+                    "page_number": page,
+                    "file_id": file_id,
+                    "chunk_insert_date": "2025-05-15T04:32:44.644586",
+                })
+                if len(records) == size:
+                    return records
+    return records
+
+
+@dataclass
+class StubProfile:
+    """How the stub misbehaves. Rates are probabilities per request."""
+
+    latency: LatencySampler = parse_latency("fixed:0")
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+    slow_body_rate: float = 0.0
+    slow_body_chunks: int = 8
+    slow_body_delay: float = 0.05
+    top_k: int = 10
+    seed: int | None = None
+
+
+def create_stub_app(records: list[dict[str, Any]], profile: StubProfile | None = None) -> Starlette:
+    """Build a Starlette app that answers `POST /search` like the TachyonSearchAPI.
+
+    Requests must carry the headers `post_tachyon_request` sends (401 otherwise)
+    and a JSON body with `query` and `usecaseId` (400 otherwise). Hits are ranked
+    by cosine similarity over a hashed bag-of-words index of `records`. After
+    sampling a latency the stub may answer 500/503 (`error_rate`), 429 with
+    `Retry-After` (`throttle_rate`), or stream the body in slow chunks
+    (`slow_body_rate`). `GET /stats` reports counts per outcome.
+    """
+    profile = profile or StubProfile()
+    rng = random.Random(profile.seed)
+    embedder = HashingEmbedder()
+    texts = [f"{r['title']} {r['raw_context']}" for r in records]
+    index = LocalVectorIndex(records, normalize_rows(embedder(texts)), embedder)
+    counts: dict[str, int] = {}
+
+    def count(outcome: str) -> None:
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    async def search(request: Request) -> Response:
+        missing = [h for h in REQUIRED_HEADERS if not request.headers.get(h)]
+        if missing or not request.headers["authorization"].startswith("Bearer "):
+            count("401")
+            return JSONResponse({"error": f"Missing or invalid headers: {', '.join(missing) or 'authorization'}"}, 401)
+        try:
+            payload = await request.json()
+            query, usecase_id = payload["query"], payload["usecaseId"]
+        except (ValueError, KeyError, TypeError):
+            count("400")
+            return JSONResponse({"error": "Body must be JSON with 'query' and 'usecaseId'"}, 400)
+        headers = {"x-request-id": request.headers["x-request-id"], "x-correlation-id": request.headers["x-correlation-id"]}
+
+        await asyncio.sleep(profile.latency(rng))
+        roll = rng.random()
+        if roll < profile.error_rate:
+            status = rng.choice((500, 503))
+            count(str(status))
+            return JSONResponse({"error": "Injected upstream failure"}, status, headers=headers)
+        if roll < profile.error_rate + profile.throttle_rate:
+            count("429")
+            headers["Retry-After"] = f"{profile.retry_after:g}"
+            return JSONResponse({"error": "Too many requests"}, 429, headers=headers)
+
+        hits = [hit for hit in index.search(query, profile.top_k) if hit["record"]["usecase_id"] == usecase_id]
+        body = dumps_bytes({"result": {"hits": hits}})
+        if rng.random() < profile.slow_body_rate:
+            count("200_slow")
+            return StreamingResponse(slow_body(body), media_type="application/json", headers=headers)
+        count("200")
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def slow_body(body: bytes) -> AsyncIterator[bytes]:
+        step = max(len(body) // profile.slow_body_chunks, 1)
+        for start in range(0, len(body), step):
+            yield body[start:start + step]
+            await asyncio.sleep(profile.slow_body_delay)
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse({"corpus_size": len(records), "responses": counts})
+
+    return Starlette(routes=[
+        Route("/search", search, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the TachyonSearchAPI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--corpus-size", type=int, default=5000, help="Number of generated chunks")
+    parser.add_argument("--usecase-id", default="test_search_v1")
+    parser.add_argument("--latency", type=parse_latency, default="lognormal:0.08,0.5",
+                        help="fixed:S, uniform:LOW,HIGH, exponential:MEAN or lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500/503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--slow-body-rate", type=float, default=0.0, help="Share of responses streamed slowly")
+    parser.add_argument("--slow-body-chunks", type=int, default=8)
+    parser.add_argument("--slow-body-delay", type=float, default=0.05, help="Seconds between slow body chunks")
+    parser.add_argument("--top-k", type=int, default=10, help="Hits returned per search")
+    parser.add_argument("--seed", type=int, help="Seed the injected latencies and failures")
+    args = parser.parse_args()
+
+    profile = StubProfile(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        slow_body_rate=args.slow_body_rate,
+        slow_body_chunks=args.slow_body_chunks,
+        slow_body_delay=args.slow_body_delay,
+        top_k=args.top_k,
+        seed=args.seed,
+    )
+    records = generate_corpus(args.corpus_size, args.usecase_id)
+    print(f"Serving {len(records)} chunks at http://{args.host}:{args.port}/search "
+          f"(set TACHYON_SEARCH_API_URL to use it)")
+    uvicorn.run(create_stub_app(records, profile), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import warnings
+from contextlib import contextmanager
+from typing import Any, Iterator, Mapping, Sequence
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+# Spans go to OTEL_EXPORTER_OTLP_ENDPOINT when set, otherwise to a local JSON Lines file
+TRACES_FILE = os.getenv("TRACES_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+
+tracer = trace.get_tracer("mcp-search")
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a JSON Lines file, opened on the first export."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.writelines(span.to_json(indent=None) + "\n" for span in spans)
+        self.file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def span_exporter() -> SpanExporter:
+    """The OTLP exporter when OTLP_ENDPOINT is set and the exporter is installed, else the file exporter."""
+    if OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            warnings.warn(
+                "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp-proto-http is not "
+                f"installed; writing spans to {TRACES_FILE} instead"
+            )
+        else:
+            return OTLPSpanExporter()
+    return JsonLinesSpanExporter(TRACES_FILE)
+
+
+def configure_tracing(service_name: str) -> None:
+    """Install the process-wide tracer provider (only the first call takes effect).
+
+    Call it from entry points, not at import, so importing a module has no side effects.
+    """
+    if isinstance(trace.get_tracer_provider(), TracerProvider):
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter()))
+    trace.set_tracer_provider(provider)
+
+
+def current_trace_id() -> str | None:
+    """Hex trace id of the active span, or None outside a trace."""
+    context = trace.get_current_span().get_span_context()
+    return trace.format_trace_id(context.trace_id) if context.is_valid else None
+
+
+def inject_trace_headers(headers: dict[str, str]) -> dict[str, str]:
+    """Add W3C `traceparent`/`tracestate` headers for the active span to `headers`."""
+    propagate.inject(headers)
+    return headers
+
+
+@contextmanager
+def server_span(name: str, headers: Mapping[str, str], **attributes: Any) -> Iterator[trace.Span]:
+    """Open a server span continuing the trace carried by incoming request `headers`."""
+    parent = propagate.extract(dict(headers))
+    with tracer.start_as_current_span(name, context=parent, kind=trace.SpanKind.SERVER) as span:
+        span.set_attributes(attributes)
+        yield span